@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Concurrent load benchmark for the read endpoints
+
+Drives a running API server with a fixed number of concurrent clients and
+prints throughput and latency percentiles per concurrency level. Run it
+against two builds (for example before and after the async database layer)
+started the same way to compare them.
+
+    python -m uvicorn main:app --port 8000 --workers 1
+    python benchmarks/load.py --url http://localhost:8000 --concurrency 1 8 32 --duration 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import List
+
+import httpx
+
+def endpoints(found_ids: List[str]) -> List[str]:
+    paths = ["/api/found?limit=100", "/api/found?status=available&limit=20", "/api/stats", "/api/locations"]
+    paths += [f"/api/found/{item_id}" for item_id in found_ids[:20]]
+    return paths
+
+async def client(http: httpx.AsyncClient, paths: List[str], deadline: float, latencies: List[float], errors: List):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            response = await http.get(path)
+        except httpx.HTTPError as e:
+            # A worker whose event loop is blocked stops answering at all
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+async def run_level(url: str, paths: List[str], concurrency: int, duration: float):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=duration + 30) as http:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client(http, paths, deadline, latencies, errors) for _ in range(concurrency)))
+    if not latencies:
+        print(f"{concurrency:>11}  {'-':>9}  {'-':>8}  {'-':>8}  {len(errors):>6}")
+        return
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{concurrency:>11}  {len(latencies) / duration:>9.1f}  {p50:>8.1f}  {p95:>8.1f}  {len(errors):>6}")
+
+async def main(url: str, concurrency: List[int], duration: float):
+    async with httpx.AsyncClient(base_url=url) as http:
+        found_ids = [item["id"] for item in (await http.get("/api/found?limit=100")).json()]
+    paths = endpoints(found_ids)
+    print(f"{len(paths)} endpoints, {duration:.0f}s per level")
+    print(f"{'concurrency':>11}  {'req/s':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'errors':>6}")
+    for level in concurrency:
+        await run_level(url, paths, level, duration)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.concurrency, args.duration))
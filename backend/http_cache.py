@@ -0,0 +1,57 @@
+import os
+import re
+import hashlib
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+# Content-addressed blobs and their thumbnails never change once published
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Near-static reference data such as locations
+REFERENCE_CACHE_CONTROL = f"public, max-age={int(os.getenv('REFERENCE_MAX_AGE', '3600'))}"
+# Item listings change as items are logged and claimed
+LISTING_CACHE_CONTROL = f"public, max-age={int(os.getenv('LISTING_MAX_AGE', '30'))}"
+# Single items change status, so clients revalidate every time (cheaply, against the ETag)
+REVALIDATE = "no-cache"
+
+CONTENT_ADDRESSED = re.compile(r"^(derived/)?[0-9a-f]{2}/[0-9a-f]{64}[.-]")
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that marks content-addressed files immutable.
+
+    Starlette already sends an ETag and Last-Modified and answers
+    If-None-Match / If-Modified-Since with 304.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        path = self.get_path(scope)
+        # Photos stored before content addressing were rewritten in place when processed
+        response.headers["Cache-Control"] = IMMUTABLE if CONTENT_ADDRESSED.match(path) else REVALIDATE
+        return response
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match comparison, which is weak: W/"x" matches "x" """
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+async def conditional_get(request: Request, call_next):
+    """Give cacheable JSON responses a strong ETag and answer matching If-None-Match with 304.
+
+    Applies to successful GETs whose endpoint set a Cache-Control header.
+    """
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD") or response.status_code != 200 \
+            or "cache-control" not in response.headers or "etag" in response.headers:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = dict(response.headers)
+    headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        headers.pop("content-length", None)
+        headers.pop("content-type", None)
+        return Response(status_code=304, headers=headers)
+    return Response(body, status_code=200, headers=headers)
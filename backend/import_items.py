@@ -0,0 +1,56 @@
+"""
+Bulk import of found items from an intake manifest.
+
+    python import_items.py manifest.csv --photos photos/
+    python import_items.py manifest.ndjson --photos photos.zip
+"""
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import AsyncSessionLocal, async_engine
+from services.item_service import ItemService
+from services.matching_service import MatchingService
+from services.phash_index import phash_index
+from services.bulk_import import parse_manifest, DirectoryPhotos, ZipPhotos
+
+async def import_items(manifest: Path, photos: Path = None) -> int:
+    item_service = ItemService()
+    matching_service = MatchingService()
+    try:
+        rows = parse_manifest(manifest.read_bytes(), manifest.name)
+        photo_source = None
+        if photos is not None:
+            photo_source = DirectoryPhotos(photos) if photos.is_dir() else ZipPhotos(open(photos, "rb"))
+        async with AsyncSessionLocal() as db:
+            await matching_service.prepare(db)
+            await phash_index.load(db)
+            report = await item_service.import_found_items(db, rows, photo_source)
+        created = [row["id"] for row in report if row["status"] == "created"]
+        with_photos = [row["id"] for row in report if row["status"] == "created" and row["photos"]]
+        if with_photos:
+            await item_service.process_photos_job(with_photos)
+        if created:
+            await matching_service.match_found_items_job(created)
+        for row in report:
+            print(json.dumps(row))
+        print(f"Imported {len(created)} of {len(report)} rows", file=sys.stderr)
+        return 0 if len(created) == len(report) else 1
+    finally:
+        item_service.file_service.shutdown()
+        await async_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Import found items from an NDJSON or CSV manifest")
+    parser.add_argument("manifest", type=Path)
+    parser.add_argument("--photos", type=Path, help="directory or zip holding the photos the manifest names")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(import_items(args.manifest, args.photos)))
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,34 @@
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 from models import Base, Location, User, ItemFound, ItemLost
+from services.reference_cache import location_cache
+from sqlalchemy import inspect
 from datetime import datetime, timedelta
+from pathlib import Path
 import uuid
 
+def prepare_schema():
+    """Bring the database schema to the latest migration.
+    
+    A fresh database gets every table from the models and is stamped at head.
+    An existing one is upgraded, after being stamped at 0001 if it was created
+    by init_db.py before migrations existed.
+    """
+    from alembic import command
+    from alembic.config import Config
+    config = Config(str(Path(__file__).parent / "alembic.ini"))
+    inspector = inspect(engine)
+    if not inspector.has_table("items_found"):
+        Base.metadata.create_all(bind=engine)
+        command.stamp(config, "head")
+        return
+    if not inspector.has_table("alembic_version"):
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
 def init_database():
     """Initialize database with sample data"""
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    prepare_schema()
     
     db = SessionLocal()
     
@@ -35,6 +56,8 @@ def init_database():
             db.add(location)
         
         db.commit()
+        # Running API workers pick up the new locations (with REFERENCE_CACHE_INVALIDATION_FILE set)
+        location_cache.invalidate()
         
         # Create sample users
         users = [
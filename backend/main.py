@@ -1,22 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import datetime
 import os
+import asyncio
+import zipfile
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db, engine
-from models import Base
+# Before the local imports: several modules read their settings from the environment on import
+load_dotenv()
+
+from http_cache import CachedStaticFiles, conditional_get, REFERENCE_CACHE_CONTROL, LISTING_CACHE_CONTROL, REVALIDATE
+from database import get_async_db, async_engine, AsyncSessionLocal, statement_counter, pool_metrics
+from init_db import prepare_schema
 from schemas import *
 from services.item_service import ItemService
+from services.file_service import PhotoTooLarge, UnsupportedPhoto
+from services.bulk_import import parse_manifest, ZipPhotos
+from services.export import DATASETS, FORMATS, export_rows
 from services.matching_service import MatchingService
 from services.auth_service import AuthService
+from services.ann_index import found_index
+from services.phash_index import phash_index
+from services.reference_cache import location_cache
 
-load_dotenv()
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create or migrate the schema (render.yaml starts the app without running init_db.py)
+prepare_schema()
 
 app = FastAPI(
     title="BearTracks.Nice API",
@@ -31,32 +44,88 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Static files for uploaded photos
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Report SQL statements per request in development so test_api.py can check query budgets
+if os.getenv("DEBUG", "false").lower() == "true":
+    @app.middleware("http")
+    async def count_statements(request: Request, call_next):
+        counter = [0]
+        token = statement_counter.set(counter)
+        try:
+            response = await call_next(request)
+        finally:
+            statement_counter.reset(token)
+        response.headers["X-DB-Statements"] = str(counter[0])
+        return response
+
+# Strong ETags and 304s for read endpoints that declare a Cache-Control policy
+app.middleware("http")(conditional_get)
+
+# Static files for uploaded photos; content-addressed ones are served as immutable
+app.mount("/uploads", CachedStaticFiles(directory="uploads"), name="uploads")
 
 # Services
 item_service = ItemService()
 matching_service = MatchingService()
 auth_service = AuthService()
 
+@app.on_event("startup")
+async def prepare_derived_data():
+    async with AsyncSessionLocal() as db:
+        await matching_service.prepare(db)
+        await item_service.stats.rebuild(db)
+        await phash_index.load(db)
+    # Thumbnails for older photos are rendered in the background while requests are served
+    app.state.photo_backfill = asyncio.create_task(item_service.backfill_photos())
+
+@app.on_event("shutdown")
+async def snapshot_matching():
+    if found_index is not None:
+        found_index.save()
+        found_index.shutdown()
+
+@app.on_event("shutdown")
+async def close_connections():
+    app.state.photo_backfill.cancel()
+    # Pooled aiosqlite connections each hold a worker thread that would keep the process alive
+    await async_engine.dispose()
+    item_service.file_service.shutdown()
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_user_email(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> str:
+    """Email (sub claim) of the bearer token's user; 401 without a valid token"""
+    claims = auth_service.decode_token(credentials.credentials) if credentials else None
+    if not claims or not claims.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return claims["sub"]
+
 @app.get("/")
 async def root():
     return {"message": "BearTracks.Nice API is running! 🐻✨"}
 
 # Auth endpoints
 @app.post("/api/auth/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     return await auth_service.create_user(db, user_data)
 
 @app.post("/api/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     return await auth_service.authenticate_user(db, credentials)
 
+@app.get("/api/auth/me", response_model=UserResponse)
+async def get_me(email: str = Depends(get_current_user_email), db: AsyncSession = Depends(get_async_db)):
+    user = await auth_service.get_user_by_email(db, email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unknown user")
+    return user
+
 # Found items endpoints
 @app.post("/api/found", response_model=ItemFoundResponse)
 async def create_found_item(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     description: str = Form(...),
     category: str = Form(...),
@@ -66,7 +135,7 @@ async def create_found_item(
     found_date: str = Form(...),
     found_time: Optional[str] = Form(None),
     photos: List[UploadFile] = File([]),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     item_data = ItemFoundCreate(
         title=title,
@@ -78,85 +147,209 @@ async def create_found_item(
         found_date=found_date,
         found_time=found_time
     )
-    return await item_service.create_found_item(db, item_data, photos)
+    try:
+        item = await item_service.create_found_item(db, item_data, photos)
+    except PhotoTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedPhoto as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Strip EXIF, hash photos and match against existing lost reports after the response has been sent
+    if item.photos:
+        background_tasks.add_task(item_service.process_photos_job, [item.id])
+    background_tasks.add_task(matching_service.match_found_item_job, item.id)
+    return item
+
+@app.post("/api/found/bulk", response_model=BulkImportResponse)
+async def bulk_import_found_items(
+    background_tasks: BackgroundTasks,
+    manifest: UploadFile = File(...),
+    photos: Optional[UploadFile] = File(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # NDJSON or CSV manifest, one found item per row, with the photos it names in one zip
+    try:
+        rows = parse_manifest(await manifest.read(), manifest.filename)
+        photo_source = await run_in_threadpool(ZipPhotos, photos.file) if photos else None
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    report = await item_service.import_found_items(db, rows, photo_source)
+    created = [row for row in report if row["status"] == "created"]
+    # Photos and matching run once for the whole batch after the response
+    with_photos = [row["id"] for row in created if row["photos"]]
+    if with_photos:
+        background_tasks.add_task(item_service.process_photos_job, with_photos)
+    if created:
+        background_tasks.add_task(matching_service.match_found_items_job, [row["id"] for row in created])
+    return {"created": len(created), "failed": len(report) - len(created), "rows": report}
 
 @app.get("/api/found", response_model=List[ItemFoundResponse])
 async def get_found_items(
+    response: Response,
     status: Optional[str] = None,
     category: Optional[str] = None,
     location_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    response.headers["Cache-Control"] = LISTING_CACHE_CONTROL
+    # Passing cursor (empty for the first page) switches to keyset pagination
+    if cursor is not None:
+        try:
+            items, next_cursor = await item_service.get_found_items_page(
+                db, status, category, location_id, cursor, limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return items
     return await item_service.get_found_items(db, status, category, location_id, skip, limit)
 
+@app.get("/api/search", response_model=List[ItemFoundResponse])
+async def search_found_items(
+    response: Response,
+    q: str,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    location_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Full-text search over title and description, combined with the listing filters
+    try:
+        items = await item_service.search_found_items(db, q, status, category, location_id, skip, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["Cache-Control"] = LISTING_CACHE_CONTROL
+    return items
+
 @app.get("/api/found/{item_id}", response_model=ItemFoundResponse)
-async def get_found_item(item_id: str, db: Session = Depends(get_db)):
+async def get_found_item(item_id: str, response: Response, db: AsyncSession = Depends(get_async_db)):
     item = await item_service.get_found_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
+    response.headers["Cache-Control"] = REVALIDATE
     return item
 
-@app.put("/api/found/{item_id}/status")
+@app.get("/api/found/{item_id}/duplicates", response_model=List[ItemFoundResponse])
+async def get_possible_duplicates(item_id: str, db: AsyncSession = Depends(get_async_db)):
+    # Items whose photos look like this item's, nearest first
+    return await item_service.get_possible_duplicates(db, item_id)
+
+@app.put("/api/found/{item_id}/status", response_model=ItemFoundResponse)
 async def update_item_status(
     item_id: str,
     status_update: ItemStatusUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return await item_service.update_item_status(db, item_id, status_update.status)
+    item = await item_service.update_item_status(db, item_id, status_update.status)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
 
 # Lost items endpoints
 @app.post("/api/lost", response_model=ItemLostResponse)
 async def create_lost_item(
     item_data: ItemLostCreate,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Create lost item and find matches
     lost_item = await item_service.create_lost_item(db, item_data)
     matches = await matching_service.find_matches(db, lost_item.id)
+    # A photo not hashed yet is hashed after the response, then the report is matched again with it
+    if lost_item.photo_url and not lost_item.photo_phash:
+        background_tasks.add_task(item_service.hash_lost_photo_job, lost_item.id)
+        background_tasks.add_task(matching_service.find_matches_job, lost_item.id)
     
-    return ItemLostResponse(
-        **lost_item.dict(),
-        matches_suggested=[{"found_id": m.found_id, "score": m.score} for m in matches[:5]]
-    )
+    response = ItemLostResponse.from_orm(lost_item)
+    response.matches_suggested = [{"found_id": m.found_id, "score": m.score} for m in matches[:5]]
+    return response
 
 @app.get("/api/lost/{item_id}/matches", response_model=List[MatchResponse])
-async def get_matches(item_id: str, db: Session = Depends(get_db)):
+async def get_matches(item_id: str, db: AsyncSession = Depends(get_async_db)):
     return await matching_service.get_matches_for_lost_item(db, item_id)
 
 # Claims endpoints
 @app.post("/api/claims", response_model=ClaimResponse)
-async def create_claim(claim_data: ClaimCreate, db: Session = Depends(get_db)):
+async def create_claim(claim_data: ClaimCreate, db: AsyncSession = Depends(get_async_db)):
     return await item_service.create_claim(db, claim_data)
 
 @app.get("/api/claims", response_model=List[ClaimResponse])
 async def get_claims(
+    response: Response,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # Passing cursor (empty for the first page) switches to keyset pagination
+    if cursor is not None:
+        try:
+            claims, next_cursor = await item_service.get_claims_page(db, status, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return claims
     return await item_service.get_claims(db, status, skip, limit)
 
 @app.put("/api/claims/{claim_id}/verify")
 async def verify_claim(
     claim_id: str,
     verification: ClaimVerification,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     return await item_service.verify_claim(db, claim_id, verification)
 
+# Export endpoint
+@app.get("/api/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[str] = None
+):
+    # items_found, matches or claims as NDJSON or CSV, streamed row batch by row batch
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset; choose one of {', '.join(DATASETS)}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    filename = f"{dataset}-{datetime.now():%Y%m%d}.{format}"
+    return StreamingResponse(
+        export_rows(DATASETS[dataset], format, since, until, status),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 # Locations endpoint
 @app.get("/api/locations", response_model=List[LocationResponse])
-async def get_locations(db: Session = Depends(get_db)):
+async def get_locations(response: Response, db: AsyncSession = Depends(get_async_db)):
+    response.headers["Cache-Control"] = REFERENCE_CACHE_CONTROL
     return await item_service.get_locations(db)
 
 # Stats endpoint
 @app.get("/api/stats", response_model=StatsResponse)
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
     return await item_service.get_stats(db)
 
+# Connection pool metrics, for sizing workers against the database
+@app.get("/api/metrics/db")
+async def get_db_metrics():
+    return pool_metrics()
+
+# Reference data cache hit rates
+@app.get("/api/metrics/cache")
+async def get_cache_metrics():
+    return {"locations": location_cache.stats()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,57 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import engine
+from models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    # The app also migrates on startup; leave uvicorn's loggers running
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Full-text search objects created by raw DDL (models.FOUND_SEARCH_DDL, migration 0010):
+# the FTS5 table with its shadow tables on SQLite, the tsvector column and its index on Postgres
+SEARCH_TABLE_PREFIX = "items_found_fts"
+SEARCH_COLUMNS = {"search_vector"}
+SEARCH_INDEXES = {"ix_items_found_search_vector"}
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the search objects out of autogenerate, which would otherwise drop them"""
+    if type_ == "table" and name.startswith(SEARCH_TABLE_PREFIX):
+        return False
+    if type_ == "column" and name in SEARCH_COLUMNS:
+        return False
+    if type_ == "index" and name in SEARCH_INDEXES:
+        return False
+    return True
+
+def run_migrations_offline():
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object,
+        render_as_batch=engine.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite cannot ALTER constraints in place, so Alembic rebuilds the table
+            render_as_batch=connection.dialect.name == "sqlite"
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
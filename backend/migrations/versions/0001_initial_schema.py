@@ -0,0 +1,91 @@
+"""Initial schema, as created by init_db.py before migrations existed
+
+Databases created that way can be brought under Alembic with
+`alembic stamp 0001` followed by `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("campus_id", sa.String(64), nullable=True, unique=True),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "locations",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("building", sa.String(), nullable=False),
+        sa.Column("floor", sa.String(), nullable=True),
+    )
+    op.create_table(
+        "items_found",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("location_id", sa.Integer(), sa.ForeignKey("locations.id"), nullable=False),
+        sa.Column("reporter_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("found_at", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "item_photos",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("item_id", sa.String(), sa.ForeignKey("items_found.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("phash", sa.String(), nullable=True),
+        sa.Column("img_embedding", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "items_lost",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("reporter_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("last_seen_location_id", sa.Integer(), sa.ForeignKey("locations.id"), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=False),
+        sa.Column("photo_url", sa.String(), nullable=True),
+        sa.Column("text_embedding", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "matches",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("lost_id", sa.String(), sa.ForeignKey("items_lost.id"), nullable=False),
+        sa.Column("found_id", sa.String(), sa.ForeignKey("items_found.id"), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("auto_suggested", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "claims",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("found_id", sa.String(), sa.ForeignKey("items_found.id"), nullable=False),
+        sa.Column("claimant_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("hold_code", sa.String(6), nullable=True),
+        sa.Column("requested_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("verified_at", sa.DateTime(), nullable=True),
+        sa.Column("verifier_id", sa.String(), sa.ForeignKey("users.id"), nullable=True),
+    )
+
+def downgrade():
+    for table in ("claims", "matches", "items_lost", "item_photos", "items_found", "locations", "users"):
+        op.drop_table(table)
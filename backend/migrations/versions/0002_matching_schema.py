@@ -0,0 +1,41 @@
+"""Matching schema: inverted token index, stored term sets and embeddings, unique match pairs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "found_item_terms",
+        sa.Column("term", sa.String(), primary_key=True),
+        sa.Column("found_id", sa.String(), sa.ForeignKey("items_found.id", ondelete="CASCADE"), primary_key=True),
+    )
+    op.create_index("ix_found_item_terms_found_id", "found_item_terms", ["found_id"])
+    op.create_table(
+        "term_stats",
+        sa.Column("term", sa.String(), primary_key=True),
+        sa.Column("doc_freq", sa.Integer(), nullable=False),
+    )
+    op.add_column("items_found", sa.Column("search_terms", sa.Text(), nullable=True))
+    op.add_column("items_found", sa.Column("text_embedding", sa.LargeBinary(), nullable=True))
+    # The API backfills the token index and, in hybrid mode, embeddings on startup
+    with op.batch_alter_table("matches") as batch_op:
+        batch_op.create_unique_constraint("uq_matches_lost_found", ["lost_id", "found_id"])
+
+def downgrade():
+    with op.batch_alter_table("matches") as batch_op:
+        batch_op.drop_constraint("uq_matches_lost_found", type_="unique")
+    with op.batch_alter_table("items_found") as batch_op:
+        batch_op.drop_column("text_embedding")
+        batch_op.drop_column("search_terms")
+    op.drop_table("term_stats")
+    op.drop_index("ix_found_item_terms_found_id", table_name="found_item_terms")
+    op.drop_table("found_item_terms")
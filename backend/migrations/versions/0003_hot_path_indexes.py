@@ -0,0 +1,38 @@
+"""Secondary indexes matched to the API's filter, sort and join shapes
+
+users.email needs no new index: its unique constraint is already backed by one.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_items_found_status_found_at", "items_found", ["status", "found_at"]),
+    ("ix_items_found_location_found_at", "items_found", ["location_id", "found_at"]),
+    ("ix_items_found_status_created_at", "items_found", ["status", "created_at", "id"]),
+    ("ix_items_found_category_created_at", "items_found", ["category", "created_at", "id"]),
+    ("ix_items_found_created_at", "items_found", ["created_at", "id"]),
+    ("ix_item_photos_item_id", "item_photos", ["item_id"]),
+    ("ix_items_lost_created_at", "items_lost", ["created_at"]),
+    ("ix_matches_lost_id_score", "matches", ["lost_id", sa.text("score DESC")]),
+    ("ix_matches_found_id", "matches", ["found_id"]),
+    ("ix_claims_status_requested_at", "claims", ["status", "requested_at", "id"]),
+    ("ix_claims_requested_at", "claims", ["requested_at", "id"]),
+    ("ix_claims_found_id", "claims", ["found_id"]),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
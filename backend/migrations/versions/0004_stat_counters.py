@@ -0,0 +1,24 @@
+"""Incrementally maintained dashboard counters (STATS_COUNTERS=true)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Populated from a full aggregation when the API starts with counters enabled
+    op.create_table(
+        "stat_counters",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("stat_counters")
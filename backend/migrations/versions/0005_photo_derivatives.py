@@ -0,0 +1,22 @@
+"""Photo content hashes and thumbnail derivatives
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("item_photos", sa.Column("content_hash", sa.String(), nullable=True))
+    op.add_column("item_photos", sa.Column("derivatives", sa.Text(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("item_photos") as batch_op:
+        batch_op.drop_column("derivatives")
+        batch_op.drop_column("content_hash")
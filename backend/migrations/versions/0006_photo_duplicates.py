@@ -0,0 +1,25 @@
+"""Near-duplicate photo flag
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("item_photos") as batch_op:
+        batch_op.add_column(sa.Column("duplicate_of", sa.String(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_item_photos_duplicate_of", "item_photos", ["duplicate_of"], ["id"], ondelete="SET NULL"
+        )
+
+def downgrade():
+    with op.batch_alter_table("item_photos") as batch_op:
+        batch_op.drop_constraint("fk_item_photos_duplicate_of", type_="foreignkey")
+        batch_op.drop_column("duplicate_of")
@@ -0,0 +1,20 @@
+"""Perceptual hash of a lost report's photo
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("items_lost", sa.Column("photo_phash", sa.String(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("items_lost") as batch_op:
+        batch_op.drop_column("photo_phash")
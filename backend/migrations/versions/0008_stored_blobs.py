@@ -0,0 +1,29 @@
+"""Reference counts for content-addressed photo blobs
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "stored_blobs",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    # Photos stored so far live directly under /uploads/, one reference per row
+    op.execute(
+        "INSERT INTO stored_blobs (key, refcount) "
+        "SELECT substr(url, 10), count(*) FROM item_photos WHERE url LIKE '/uploads/%' GROUP BY url"
+    )
+
+def downgrade():
+    op.drop_table("stored_blobs")
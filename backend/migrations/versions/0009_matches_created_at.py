@@ -0,0 +1,18 @@
+"""Index for exporting matches by creation date
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_matches_created_at", "matches", ["created_at", "id"])
+
+def downgrade():
+    op.drop_index("ix_matches_created_at", table_name="matches")
@@ -0,0 +1,57 @@
+"""Full-text search index over found items' title and description
+
+SQLite: an FTS5 table kept in step with items_found by triggers.
+Postgres: a stored generated tsvector column with a GIN index.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE items_found_fts USING fts5("
+    "id UNINDEXED, title, description, tokenize='porter unicode61', prefix='2 3')",
+    "CREATE TRIGGER items_found_fts_insert AFTER INSERT ON items_found BEGIN "
+    "INSERT INTO items_found_fts (id, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER items_found_fts_update AFTER UPDATE OF title, description ON items_found BEGIN "
+    "UPDATE items_found_fts SET title = new.title, description = new.description WHERE id = old.id; END",
+    "CREATE TRIGGER items_found_fts_delete AFTER DELETE ON items_found BEGIN "
+    "DELETE FROM items_found_fts WHERE id = old.id; END",
+    "INSERT INTO items_found_fts (id, title, description) SELECT id, title, description FROM items_found",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER items_found_fts_delete",
+    "DROP TRIGGER items_found_fts_update",
+    "DROP TRIGGER items_found_fts_insert",
+    "DROP TABLE items_found_fts",
+]
+
+POSTGRES_UPGRADE = [
+    # Adding a stored generated column computes it for every existing row
+    "ALTER TABLE items_found ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', description), 'B')"
+    ") STORED",
+    "CREATE INDEX ix_items_found_search_vector ON items_found USING GIN (search_vector)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX ix_items_found_search_vector",
+    "ALTER TABLE items_found DROP COLUMN search_vector",
+]
+
+def upgrade():
+    statements = SQLITE_UPGRADE if op.get_bind().dialect.name == "sqlite" else POSTGRES_UPGRADE
+    for statement in statements:
+        op.execute(statement)
+
+def downgrade():
+    statements = SQLITE_DOWNGRADE if op.get_bind().dialect.name == "sqlite" else POSTGRES_DOWNGRADE
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,26 @@
+"""Drop term_stats: candidate selection only reads the postings, never document frequencies
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.drop_table("term_stats")
+
+def downgrade():
+    op.create_table(
+        "term_stats",
+        sa.Column("term", sa.String(), primary_key=True),
+        sa.Column("doc_freq", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO term_stats (term, doc_freq) SELECT term, COUNT(*) FROM found_item_terms GROUP BY term"
+    )
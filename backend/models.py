@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, LargeBinary
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, LargeBinary, UniqueConstraint, Index, DDL, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from database import Base
 import uuid
+import json
 
 class User(Base):
     __tablename__ = "users"
@@ -34,6 +35,16 @@ class Location(Base):
 
 class ItemFound(Base):
     __tablename__ = "items_found"
+    __table_args__ = (
+        # Matcher candidate window: status == available AND found_at >= ...
+        Index("ix_items_found_status_found_at", "status", "found_at"),
+        # Same-location candidates within a week of last seen
+        Index("ix_items_found_location_found_at", "location_id", "found_at"),
+        # Inventory listings filtered by status/category and paged by (created_at, id)
+        Index("ix_items_found_status_created_at", "status", "created_at", "id"),
+        Index("ix_items_found_category_created_at", "category", "created_at", "id"),
+        Index("ix_items_found_created_at", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
@@ -43,6 +54,8 @@ class ItemFound(Base):
     reporter_id = Column(String, ForeignKey("users.id"), nullable=False)
     found_at = Column(DateTime, nullable=False)
     status = Column(String, default="available")  # available, on_hold, claimed, donated, disposed
+    search_terms = Column(Text, nullable=True)  # Normalized matching terms, space separated
+    text_embedding = Column(LargeBinary, nullable=True)  # Packed float32 vector
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
@@ -54,19 +67,35 @@ class ItemFound(Base):
 
 class ItemPhoto(Base):
     __tablename__ = "item_photos"
+    __table_args__ = (
+        # Photos are loaded per page of items with item_id IN (...)
+        Index("ix_item_photos_item_id", "item_id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     item_id = Column(String, ForeignKey("items_found.id", ondelete="CASCADE"), nullable=False)
     url = Column(String, nullable=False)
     phash = Column(String, nullable=True)  # Perceptual hash as string
+    content_hash = Column(String, nullable=True)  # SHA-256 of the stored file, names its derivatives
+    derivatives = Column(Text, nullable=True)  # JSON {width: url} of generated thumbnails
+    duplicate_of = Column(String, ForeignKey("item_photos.id", ondelete="SET NULL"), nullable=True)  # Nearest earlier near-duplicate photo of another item
     img_embedding = Column(LargeBinary, nullable=True)  # Store as binary for now
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
     item = relationship("ItemFound", back_populates="photos")
+    
+    @property
+    def thumbnails(self):
+        """Thumbnail URLs by width; empty until the photo has been processed"""
+        return json.loads(self.derivatives) if self.derivatives else {}
 
 class ItemLost(Base):
     __tablename__ = "items_lost"
+    __table_args__ = (
+        # Reverse matching scans open (recently filed) reports
+        Index("ix_items_lost_created_at", "created_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     reporter_id = Column(String, ForeignKey("users.id"), nullable=False)
@@ -75,7 +104,8 @@ class ItemLost(Base):
     last_seen_location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
     last_seen_at = Column(DateTime, nullable=False)
     photo_url = Column(String, nullable=True)
-    text_embedding = Column(LargeBinary, nullable=True)  # Store as binary for now
+    photo_phash = Column(String, nullable=True)  # Perceptual hash of the photo at photo_url, when it is a stored upload
+    text_embedding = Column(LargeBinary, nullable=True)  # Packed float32 vector
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
@@ -85,6 +115,14 @@ class ItemLost(Base):
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        UniqueConstraint("lost_id", "found_id", name="uq_matches_lost_found"),
+        # get_matches_for_lost_item: lost_id == ... ORDER BY score DESC
+        Index("ix_matches_lost_id_score", "lost_id", text("score DESC")),
+        Index("ix_matches_found_id", "found_id"),
+        # Exports: created_at within a date range, in (created_at, id) order
+        Index("ix_matches_created_at", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     lost_id = Column(String, ForeignKey("items_lost.id"), nullable=False)
@@ -99,6 +137,12 @@ class Match(Base):
 
 class Claim(Base):
     __tablename__ = "claims"
+    __table_args__ = (
+        # Claims listing filtered by status and paged by (requested_at, id)
+        Index("ix_claims_status_requested_at", "status", "requested_at", "id"),
+        Index("ix_claims_requested_at", "requested_at", "id"),
+        Index("ix_claims_found_id", "found_id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     found_id = Column(String, ForeignKey("items_found.id"), nullable=False)
@@ -112,4 +156,55 @@ class Claim(Base):
     # Relationships
     found_item = relationship("ItemFound", back_populates="claims")
     claimant = relationship("User", foreign_keys=[claimant_id], back_populates="claims")
-    verifier = relationship("User", foreign_keys=[verifier_id])
\ No newline at end of file
+    verifier = relationship("User", foreign_keys=[verifier_id])
+
+class FoundItemTerm(Base):
+    __tablename__ = "found_item_terms"
+    
+    # Inverted index posting: one row per (term, available found item)
+    term = Column(String, primary_key=True)
+    found_id = Column(String, ForeignKey("items_found.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    
+    name = Column(String, primary_key=True)  # e.g. items:total, items:available, claims:requested
+    value = Column(Integer, nullable=False, default=0)
+
+class StoredBlob(Base):
+    __tablename__ = "stored_blobs"
+    
+    # Storage key, e.g. "ab/ab12...ef.jpg": the SHA-256 of the bytes as uploaded, before EXIF
+    # is stripped, so identical uploads share a blob. It differs from ItemPhoto.content_hash,
+    # the hash of the published file, whenever metadata was removed.
+    key = Column(String, primary_key=True)
+    refcount = Column(Integer, nullable=False, default=0)  # ItemPhoto rows pointing at the blob
+    created_at = Column(DateTime, server_default=func.now())
+
+# Full-text search over found items' title and description (services/search.py).
+# SQLite keeps an FTS5 table in step through triggers; Postgres keeps a stored
+# generated tsvector, title weighted above description, behind a GIN index.
+# Migration 0010 creates the same objects on existing databases.
+FOUND_SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE items_found_fts USING fts5("
+        "id UNINDEXED, title, description, tokenize='porter unicode61', prefix='2 3')",
+        "CREATE TRIGGER items_found_fts_insert AFTER INSERT ON items_found BEGIN "
+        "INSERT INTO items_found_fts (id, title, description) VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER items_found_fts_update AFTER UPDATE OF title, description ON items_found BEGIN "
+        "UPDATE items_found_fts SET title = new.title, description = new.description WHERE id = old.id; END",
+        "CREATE TRIGGER items_found_fts_delete AFTER DELETE ON items_found BEGIN "
+        "DELETE FROM items_found_fts WHERE id = old.id; END",
+    ],
+    "postgresql": [
+        "ALTER TABLE items_found ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', description), 'B')"
+        ") STORED",
+        "CREATE INDEX ix_items_found_search_vector ON items_found USING GIN (search_vector)",
+    ],
+}
+
+for _dialect, _statements in FOUND_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(ItemFound.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(ItemFound.__table__, "before_drop", DDL("DROP TABLE IF EXISTS items_found_fts").execute_if(dialect="sqlite"))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 # User schemas
@@ -52,6 +52,8 @@ class ItemFoundCreate(BaseModel):
 class ItemPhotoResponse(BaseModel):
     id: str
     url: str
+    thumbnails: Dict[str, str] = {}  # width -> URL, e.g. "320" for inventory grids
+    duplicate_of: Optional[str] = None  # id of a near-identical photo already logged for another item
     created_at: datetime
     
     class Config:
@@ -72,6 +74,18 @@ class ItemFoundResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkImportRow(BaseModel):
+    row: int  # 1-based position in the manifest
+    status: str  # created, error
+    id: Optional[str] = None
+    photos: int = 0
+    error: Optional[str] = None
+
+class BulkImportResponse(BaseModel):
+    created: int
+    failed: int
+    rows: List[BulkImportRow]
+
 class ItemLostCreate(BaseModel):
     title: str
     description: str
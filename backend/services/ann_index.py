@@ -0,0 +1,272 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .embedding_service import EMBEDDING_DTYPE
+
+class IVFIndex:
+    """In-process IVF-flat approximate nearest-neighbour index over unit-length vectors.
+
+    Vectors are bucketed by their nearest k-means centroid, and a search only
+    scans the nprobe buckets closest to the query. Small indexes are scanned
+    exhaustively. Removal tombstones the row; tombstones are compacted away
+    when the index is retrained.
+
+    Retraining and snapshot writes run on one background thread: they copy
+    what they need under the lock, do the slow part without it, and only
+    retake it to install the result, so inserts and searches never wait on
+    k-means or disk.
+    """
+
+    def __init__(self, path: Optional[str] = None, nprobe: int = 8, min_train_size: int = 1024,
+                 snapshot_every: int = 100):
+        self.path = Path(path) if path else None
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.snapshot_every = snapshot_every
+        self._lock = Lock()
+        self._background: Optional[ThreadPoolExecutor] = None
+        self._reset(0)
+
+    def _reset(self, dim: int):
+        self.dim = dim
+        self.ids: List[str] = []
+        self.rows = {}
+        self.vectors = np.zeros((0, dim), dtype=EMBEDDING_DTYPE)
+        self.alive = np.zeros(0, dtype=bool)
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self.saved_at: Optional[datetime] = None
+        self._mutations = 0
+        self._training = False
+        self._saving = False
+        # Rows written while a retrain is running; their assignments are redone when it installs
+        self._dirty: Set[int] = set()
+
+    def __len__(self) -> int:
+        return int(self.alive[:len(self.ids)].sum())
+
+    def add(self, item_id: str, vector: np.ndarray):
+        """Insert or revive an item's vector"""
+        vector = np.asarray(vector, dtype=EMBEDDING_DTYPE)
+        with self._lock:
+            if not self.ids:
+                self._reset(len(vector))
+            elif len(vector) != self.dim:
+                return
+            row = self.rows.get(item_id)
+            if row is None:
+                row = len(self.ids)
+                self._grow(row + 1)
+                self.ids.append(item_id)
+                self.rows[item_id] = row
+            self.vectors[row] = vector
+            self.alive[row] = True
+            if self.centroids is not None:
+                self.assignments[row] = int(np.argmax(self.centroids @ vector))
+            if self._training:
+                self._dirty.add(row)
+            elif len(self) >= max(self.min_train_size, 4 * self.trained_size):
+                self._training = True
+                self._submit(self._train)
+            self._mutated()
+
+    def remove(self, item_id: str):
+        """Tombstone an item so searches skip it"""
+        with self._lock:
+            row = self.rows.get(item_id)
+            if row is None or not self.alive[row]:
+                return
+            self.alive[row] = False
+            self._mutated()
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Approximate top-k items by cosine similarity, best first"""
+        query = np.asarray(query, dtype=EMBEDDING_DTYPE)
+        with self._lock:
+            n = len(self.ids)
+            if not n or len(query) != self.dim:
+                return []
+            mask = self.alive[:n].copy()
+            if self.centroids is not None:
+                nprobe = min(self.nprobe, len(self.centroids))
+                probed = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                mask &= np.isin(self.assignments[:n], probed)
+            rows = np.flatnonzero(mask)
+            sims = self.vectors[rows] @ query
+            if len(rows) > k:
+                best = np.argpartition(-sims, k - 1)[:k]
+                rows, sims = rows[best], sims[best]
+            order = np.argsort(-sims, kind="stable")
+            return [(self.ids[rows[i]], float(sims[i])) for i in order]
+
+    def _grow(self, size: int):
+        capacity = len(self.vectors)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 64)
+        vectors = np.zeros((capacity, self.dim), dtype=EMBEDDING_DTYPE)
+        vectors[:len(self.ids)] = self.vectors[:len(self.ids)]
+        self.vectors = vectors
+        self.alive = np.concatenate([self.alive, np.zeros(capacity - len(self.alive), dtype=bool)])
+        self.assignments = np.concatenate(
+            [self.assignments, np.zeros(capacity - len(self.assignments), dtype=np.int32)]
+        )
+
+    def reconcile(self, available_ids: Iterable[str]) -> Set[str]:
+        """Match alive flags to the items that are available now; returns available ids not indexed"""
+        available = set(available_ids)
+        with self._lock:
+            n = len(self.ids)
+            self.alive[:n] = np.fromiter((item_id in available for item_id in self.ids), dtype=bool, count=n)
+            return available.difference(self.ids)
+
+    def _submit(self, task) -> Future:
+        if self._background is None:
+            self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ann-index")
+        return self._background.submit(task)
+
+    def _train(self):
+        """Background retrain: cluster a copy of the live vectors, then install under the lock"""
+        try:
+            with self._lock:
+                n = len(self.ids)
+                live = np.flatnonzero(self.alive[:n])
+                data = self.vectors[live]
+                self._dirty = set()
+            centroids = _spherical_kmeans(data)
+            assignments = np.argmax(data @ centroids.T, axis=1).astype(np.int32)
+            with self._lock:
+                self._install(centroids, live, assignments, n)
+        except Exception as e:
+            print(f"Error retraining ANN index: {e}")
+        finally:
+            with self._lock:
+                self._training = False
+
+    def _install(self, centroids: np.ndarray, live: np.ndarray, assignments: np.ndarray, trained_rows: int):
+        """Swap in new centroids and compact tombstones, reassigning rows written during training"""
+        n = len(self.ids)
+        self.assignments[live] = assignments
+        stale = sorted(self._dirty | set(range(trained_rows, n)))
+        if stale:
+            self.assignments[stale] = np.argmax(self.vectors[stale] @ centroids.T, axis=1)
+        self._dirty = set()
+
+        keep = np.flatnonzero(self.alive[:n])
+        self.ids = [self.ids[row] for row in keep]
+        self.rows = {item_id: row for row, item_id in enumerate(self.ids)}
+        self.vectors = self.vectors[keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.assignments = self.assignments[keep]
+        self.centroids = centroids
+        self.trained_size = len(live)
+
+    def _mutated(self):
+        self._mutations += 1
+        if self.path and self._mutations >= self.snapshot_every and not self._saving:
+            self._saving = True
+            self._mutations = 0
+            self._submit(self._save)
+
+    def save(self):
+        """Write a snapshot now, after any retrain or snapshot already queued"""
+        self._submit(self._save).result()
+
+    def shutdown(self):
+        if self._background is not None:
+            self._background.shutdown(wait=True)
+            self._background = None
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            with self._lock:
+                n = len(self.ids)
+                self.saved_at = datetime.utcnow()
+                # Copies, so the file is written without holding the lock
+                snapshot = dict(
+                    ids=np.array(self.ids, dtype=str),
+                    vectors=self.vectors[:n].copy(),
+                    alive=self.alive[:n].copy(),
+                    assignments=self.assignments[:n].copy(),
+                    centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=EMBEDDING_DTYPE),
+                    trained_size=np.array(self.trained_size),
+                    saved_at=np.array(self.saved_at.isoformat())
+                )
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Per-process temp name: every worker snapshots to the same path
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **snapshot)
+            # Atomic swap so a crash mid-write never leaves a truncated snapshot
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving ANN index snapshot: {e}")
+        finally:
+            self._saving = False
+
+    def load(self) -> bool:
+        """Restore from the last snapshot; returns False if there is none"""
+        if not self.path or not self.path.exists():
+            return False
+        with self._lock, np.load(self.path) as snapshot:
+            vectors = snapshot["vectors"]
+            self._reset(vectors.shape[1])
+            self.ids = [str(item_id) for item_id in snapshot["ids"]]
+            self.rows = {item_id: row for row, item_id in enumerate(self.ids)}
+            self.vectors = vectors.astype(EMBEDDING_DTYPE)
+            self.alive = snapshot["alive"].astype(bool)
+            self.assignments = snapshot["assignments"].astype(np.int32)
+            centroids = snapshot["centroids"]
+            self.centroids = centroids if len(centroids) else None
+            self.trained_size = int(snapshot["trained_size"])
+            self.saved_at = datetime.fromisoformat(str(snapshot["saved_at"]))
+        return True
+
+def _spherical_kmeans(data: np.ndarray, iterations: int = 10) -> np.ndarray:
+    """About sqrt(n) unit-length centroids for the rows of data"""
+    nlist = max(1, int(np.sqrt(len(data))))
+    rng = np.random.default_rng(0)
+    centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        for cluster in range(nlist):
+            members = data[assignments == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                if norm > 0:
+                    centroids[cluster] = centroid / norm
+    return centroids
+
+# Only semantic (hybrid) matching reads found-item vectors, so the index exists only in that mode
+found_index = IVFIndex(
+    path=os.getenv("ANN_INDEX_PATH", "data/found_index.npz"),
+    nprobe=int(os.getenv("ANN_NPROBE", "8"))
+) if os.getenv("MATCHING_MODE", "heuristic") == "hybrid" else None
+
+def update_on_commit(db: AsyncSession, item_id: str, vector: Optional[np.ndarray]):
+    """Add an item to found_index, or remove it when vector is None, once db's transaction commits"""
+    db.sync_session.info.setdefault("found_index_updates", []).append((item_id, vector))
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_updates(session):
+    for item_id, vector in session.info.pop("found_index_updates", ()):
+        if vector is None:
+            found_index.remove(item_id)
+        else:
+            found_index.add(item_id, vector)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_index_updates(session):
+    session.info.pop("found_index_updates", None)
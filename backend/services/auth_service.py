@@ -1,24 +1,23 @@
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from typing import Optional
 import os
+import time
 
 from models import User
 from schemas import UserCreate, UserLogin, UserResponse, TokenResponse
+from .cache import LRUCache
+from .user_resolver import user_resolver
 
 class AuthService:
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         self.secret_key = os.getenv("SECRET_KEY", "your-secret-key-here")
         self.algorithm = "HS256"
         self.access_token_expire_minutes = 30
-    
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
-    
-    def get_password_hash(self, password: str) -> str:
-        return self.pwd_context.hash(password)
+        # Claims of tokens whose signature has already been checked, by token
+        self._verified_tokens = LRUCache(int(os.getenv("TOKEN_CACHE_SIZE", "1024")))
     
     def create_access_token(self, data: dict, expires_delta: timedelta = None):
         to_encode = data.copy()
@@ -30,7 +29,28 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
-    async def create_user(self, db: Session, user_data: UserCreate) -> UserResponse:
+    def decode_token(self, token: str) -> Optional[dict]:
+        """Claims of a valid, unexpired access token, or None.
+        
+        A token's signature is verified once; repeat requests with it are served
+        from the cache until its exp passes.
+        """
+        claims = self._verified_tokens.get(token)
+        if claims is None:
+            try:
+                claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            except JWTError:
+                return None
+            self._verified_tokens.set(token, claims)
+        if "exp" in claims and claims["exp"] <= time.time():
+            self._verified_tokens.invalidate(token)
+            return None
+        return claims
+    
+    async def get_user_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        return await db.scalar(select(User).where(User.email == email))
+    
+    async def create_user(self, db: AsyncSession, user_data: UserCreate) -> UserResponse:
         # For MVP, we'll create users without password (simplified auth)
         user = User(
             email=user_data.email,
@@ -39,23 +59,15 @@ class AuthService:
             campus_id=user_data.campus_id
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         return UserResponse.from_orm(user)
     
-    async def authenticate_user(self, db: Session, credentials: UserLogin) -> TokenResponse:
+    async def authenticate_user(self, db: AsyncSession, credentials: UserLogin) -> TokenResponse:
         # For MVP, simplified auth - just check if user exists
-        user = db.query(User).filter(User.email == credentials.email).first()
-        if not user:
-            # Create user on first login (simplified for MVP)
-            user = User(
-                email=credentials.email,
-                name=credentials.email.split('@')[0],  # Use email prefix as name
-                role="student"
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+        # Create user on first login (simplified for MVP), using the email prefix as name
+        user = await user_resolver.get_or_create(db, credentials.email, credentials.email.split('@')[0])
+        await db.commit()
         
         # Create access token
         access_token_expires = timedelta(minutes=self.access_token_expire_minutes)
@@ -0,0 +1,100 @@
+from datetime import datetime
+from threading import Lock
+from typing import FrozenSet, List, Optional, Sequence
+import numpy as np
+
+from .cache import LRUCache
+
+DAY_US = 86400 * 1000000
+
+# Score weights, identical to MatchingService._calculate_similarity_score
+TEXT_WEIGHT = 0.6
+LOCATION_BONUS = 0.2
+SAME_DAY_BONUS = 0.2
+SAME_WEEK_BONUS = 0.1
+
+class CandidatePool:
+    """Candidates packed as a CSR term matrix plus location and time columns"""
+
+    def __init__(self, keys: List, indptr: np.ndarray, indices: np.ndarray,
+                 location_ids: np.ndarray, times: np.ndarray):
+        self.keys = keys
+        self.indptr = indptr
+        self.indices = indices
+        self.sizes = np.diff(indptr)
+        self.location_ids = location_ids
+        self.times = times
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+class BatchScorer:
+    """Vectorized matching scores over a whole candidate pool in one pass"""
+
+    def __init__(self, cache_size: int = 50000):
+        self._vocab = {}
+        self._vocab_lock = Lock()
+        # Term id arrays are a pure function of the term set, so no invalidation is needed
+        self._ids_cache = LRUCache(cache_size)
+
+    def term_ids(self, terms: FrozenSet[str]) -> np.ndarray:
+        ids = self._ids_cache.get(terms)
+        if ids is None:
+            with self._vocab_lock:
+                ids = np.fromiter(
+                    (self._vocab.setdefault(term, len(self._vocab)) for term in terms),
+                    dtype=np.int64, count=len(terms)
+                )
+            self._ids_cache.set(terms, ids)
+        return ids
+
+    def build_pool(self, keys: List, term_sets: Sequence[FrozenSet[str]],
+                   location_ids: Sequence[int], times: Sequence[datetime]) -> CandidatePool:
+        rows = [self.term_ids(terms) for terms in term_sets]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        return CandidatePool(
+            keys,
+            indptr,
+            indices,
+            np.asarray(location_ids, dtype=np.int64),
+            _to_us(times)
+        )
+
+    def score(self, query_terms: FrozenSet[str], query_location_id: int, query_time: datetime,
+              pool: CandidatePool, query_is_lost: bool = True) -> np.ndarray:
+        """Score a lost report against found candidates, or a found item against lost reports"""
+        if not len(pool):
+            return np.zeros(0)
+
+        # Jaccard similarity: intersections from the CSR rows, unions from the set sizes
+        query_ids = self.term_ids(query_terms)
+        hits = np.isin(pool.indices, query_ids)
+        hit_counts = np.concatenate(([0], np.cumsum(hits)))
+        intersection = hit_counts[pool.indptr[1:]] - hit_counts[pool.indptr[:-1]]
+        union = pool.sizes + len(query_terms) - intersection
+        text_sim = np.zeros(len(pool))
+        if query_terms:
+            np.divide(intersection, union, out=text_sim, where=pool.sizes > 0)
+        score = TEXT_WEIGHT * text_sim
+
+        score = score + np.where(pool.location_ids == query_location_id, LOCATION_BONUS, 0.0)
+
+        # Whole days between found_at and last_seen_at, rounded down like timedelta.days
+        query_us = _to_us([query_time])[0]
+        delta = pool.times - query_us if query_is_lost else query_us - pool.times
+        time_diff = np.abs(np.floor_divide(delta, DAY_US))
+        score = score + np.select([time_diff <= 1, time_diff <= 7], [SAME_DAY_BONUS, SAME_WEEK_BONUS], 0.0)
+
+        return np.minimum(score, 1.0)
+
+    def top_k(self, scores: np.ndarray, threshold: float, k: Optional[int] = None) -> np.ndarray:
+        """Indices of scores above threshold, best first, optionally capped at k"""
+        selected = np.flatnonzero(scores > threshold)
+        if k is not None and len(selected) > k:
+            selected = selected[np.argpartition(-scores[selected], k - 1)[:k]]
+        return selected[np.argsort(-scores[selected], kind="stable")]
+
+def _to_us(times: Sequence[datetime]) -> np.ndarray:
+    return np.asarray(times, dtype="datetime64[us]").astype(np.int64)
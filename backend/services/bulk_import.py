@@ -0,0 +1,97 @@
+import os
+import io
+import csv
+import json
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional
+from fastapi import UploadFile
+
+MAX_IMPORT_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "1000"))
+
+def parse_manifest(data: bytes, filename: Optional[str] = None) -> List[Dict]:
+    """Rows of an NDJSON or CSV intake manifest.
+
+    The format follows the file extension (.csv, or .ndjson/.jsonl), falling
+    back to NDJSON when the first non-blank character is "{". In CSV the
+    photos column lists file names separated by ";".
+    """
+    text = data.decode("utf-8-sig")
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in (".ndjson", ".jsonl", ".json") or (suffix != ".csv" and text.lstrip().startswith("{")):
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Manifest line {line_number} is not valid JSON: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"Manifest line {line_number} is not a JSON object")
+            rows.append(row)
+    else:
+        rows = [
+            {key.strip(): value for key, value in row.items() if key is not None}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ValueError(f"Manifest has {len(rows)} rows; at most {MAX_IMPORT_ROWS} are imported at once")
+    return rows
+
+def photo_names(value) -> List[str]:
+    """File names listed in a row's photos field: a ";"-separated string or a list of strings"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(";")
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError('photos must be a list of file names or a ";"-separated string')
+    return [name.strip() for name in value if name.strip()]
+
+class DirectoryPhotos:
+    """Photos referenced by a manifest, read from a directory"""
+
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+
+    def open(self, name: str) -> Optional[BinaryIO]:
+        path = (self.root / name).resolve()
+        if not path.is_relative_to(self.root) or not path.is_file():
+            return None
+        return open(path, "rb")
+
+class ZipPhotos:
+    """Photos referenced by a manifest, read from a zip archive (by full path or by file name)"""
+
+    def __init__(self, archive: BinaryIO):
+        self.archive = zipfile.ZipFile(archive)
+        self.members = {}
+        basenames = {}
+        for info in self.archive.infolist():
+            if info.is_dir():
+                continue
+            self.members[info.filename] = info
+            basenames.setdefault(Path(info.filename).name, []).append(info)
+        for basename, infos in basenames.items():
+            # A bare file name resolves only when it is unambiguous
+            if len(infos) == 1:
+                self.members.setdefault(basename, infos[0])
+
+    def open(self, name: str) -> Optional[BinaryIO]:
+        info = self.members.get(name)
+        return self.archive.open(info) if info is not None else None
+
+def manifest_uploads(source, names: List[str]) -> Iterator[UploadFile]:
+    """A row's photos as UploadFiles for FileService.save_photo, each closed once consumed.
+
+    Raises ValueError for a photo that is not in the source.
+    """
+    for name in names:
+        file = source.open(name) if source is not None else None
+        if file is None:
+            raise ValueError(f"Photo {name} is not in the uploaded photos")
+        try:
+            yield UploadFile(file, filename=name)
+        finally:
+            file.close()
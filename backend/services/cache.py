@@ -0,0 +1,115 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+class LRUCache:
+    """Thread-safe in-process LRU cache"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire ttl seconds after being set, with hit/miss counters.
+
+    With an invalidation_path, invalidate() and clear() replace that file, and
+    every process sharing the path drops its own entries once it sees the change.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, invalidation_path: Optional[str] = None):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidation_path = Path(invalidation_path) if invalidation_path else None
+        self._seen_stamp = self._stamp()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        self._check_stamp()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        super().set(key, (value, time.monotonic() + self.ttl))
+
+    def invalidate(self, key: Hashable):
+        super().invalidate(key)
+        self._notify()
+
+    def clear(self):
+        super().clear()
+        self._notify()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _stamp(self):
+        if self.invalidation_path is None:
+            return None
+        try:
+            stat = self.invalidation_path.stat()
+        except FileNotFoundError:
+            return None
+        # The file is replaced rather than touched, so the inode changes even within one mtime tick
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _check_stamp(self):
+        if self.invalidation_path is None:
+            return
+        stamp = self._stamp()
+        if stamp != self._seen_stamp:
+            self._seen_stamp = stamp
+            LRUCache.clear(self)
+
+    def _notify(self):
+        if self.invalidation_path is None:
+            return
+        self.invalidation_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.invalidation_path.with_name(f"{self.invalidation_path.name}.{uuid.uuid4().hex}")
+        tmp_path.write_text(str(time.time()))
+        os.replace(tmp_path, self.invalidation_path)
+        self._seen_stamp = self._stamp()
@@ -0,0 +1,109 @@
+import os
+import hashlib
+from functools import lru_cache
+from typing import List, Optional, Sequence
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from models import ItemFound, ItemLost
+from .tokenizer import tokenize, item_text
+
+# Vectors are stored as packed little-endian float32 so a column of blobs
+# can be joined and viewed as a matrix without any parsing
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+def pack_vector(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+def unpack_vector(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+
+def unpack_matrix(blobs: Sequence[Optional[bytes]], dim: int) -> np.ndarray:
+    """Stack packed vectors into an (n, dim) matrix; missing or foreign-sized vectors become zero rows"""
+    row_bytes = dim * EMBEDDING_DTYPE.itemsize
+    zero = bytes(row_bytes)
+    joined = b"".join(blob if blob is not None and len(blob) == row_bytes else zero for blob in blobs)
+    return np.frombuffer(joined, dtype=EMBEDDING_DTYPE).reshape(len(blobs), dim)
+
+class HashingEmbedder:
+    """Deterministic feature-hashing embedder over words and character trigrams.
+
+    Needs no model download, so it is the default and the stand-in for tests.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=EMBEDDING_DTYPE)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign
+        return _normalize(vectors)
+
+    def _features(self, text: str):
+        for word in tokenize(text):
+            yield "w:" + word
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3]
+
+class SentenceTransformerEmbedder:
+    """Small local sentence-transformers model, run on CPU"""
+
+    def __init__(self, model_name: str):
+        self.model = _load_sentence_transformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=EMBEDDING_DTYPE)
+
+@lru_cache(maxsize=None)
+def _load_sentence_transformer(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device="cpu")
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+class EmbeddingService:
+    def __init__(self):
+        backend = os.getenv("EMBEDDING_BACKEND", "hashing")  # hashing, sentence-transformers
+        if backend == "sentence-transformers":
+            self.embedder = SentenceTransformerEmbedder(os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+        else:
+            self.embedder = HashingEmbedder(int(os.getenv("EMBEDDING_DIM", "384")))
+
+    @property
+    def dim(self) -> int:
+        return self.embedder.dim
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Unit-length float32 embeddings, one row per text"""
+        return self.embedder.encode(texts)
+
+    async def encode_text(self, text: str) -> bytes:
+        """Embed one text off the event loop and return it packed for storage"""
+        vectors = await run_in_threadpool(self.embed_texts, [text])
+        return pack_vector(vectors[0])
+
+    async def backfill(self, db: AsyncSession, batch_size: int = 256):
+        """Embed found and lost items stored before embeddings were computed"""
+        for model in (ItemFound, ItemLost):
+            while True:
+                items = (await db.scalars(
+                    select(model).where(model.text_embedding.is_(None)).limit(batch_size)
+                )).all()
+                if not items:
+                    break
+                vectors = await run_in_threadpool(self.embed_texts, [item_text(item) for item in items])
+                for item, vector in zip(items, vectors):
+                    item.text_embedding = pack_vector(vector)
+                await db.commit()
@@ -0,0 +1,108 @@
+import io
+import os
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy import String, literal, select
+
+from database import AsyncSessionLocal, IS_SQLITE
+from models import ItemFound, Match, Claim
+from .reference_cache import location_cache
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+class Dataset:
+    """Columns of one exported table, and the columns its date range and status filters apply to"""
+
+    def __init__(self, model, columns: List, date_column, status_column=None):
+        self.model = model
+        self.columns = columns
+        self.date_column = date_column
+        self.status_column = status_column
+
+    @property
+    def fields(self) -> List[str]:
+        names = [column.key for column in self.columns]
+        # Found items carry their location's name, filled in from the location cache
+        return names + ["location"] if "location_id" in names else names
+
+    def query(self, since: Optional[datetime], until: Optional[datetime], status: Optional[str]):
+        query = select(*self.columns)
+        if since is not None:
+            query = query.where(self.date_column >= _range_bound(since))
+        if until is not None:
+            query = query.where(self.date_column < _range_bound(until))
+        if status and self.status_column is not None:
+            query = query.where(self.status_column == status)
+        # Index order, so the database streams rows without sorting the range first
+        return query.order_by(self.date_column, self.model.id)
+
+DATASETS: Dict[str, Dataset] = {
+    "items_found": Dataset(
+        ItemFound,
+        [ItemFound.id, ItemFound.title, ItemFound.description, ItemFound.category, ItemFound.location_id,
+         ItemFound.status, ItemFound.found_at, ItemFound.created_at],
+        ItemFound.created_at, ItemFound.status
+    ),
+    "matches": Dataset(
+        Match,
+        [Match.id, Match.lost_id, Match.found_id, Match.score, Match.auto_suggested, Match.created_at],
+        Match.created_at
+    ),
+    "claims": Dataset(
+        Claim,
+        [Claim.id, Claim.found_id, Claim.claimant_id, Claim.status, Claim.requested_at,
+         Claim.verified_at, Claim.verifier_id],
+        Claim.requested_at, Claim.status
+    ),
+}
+
+def _range_bound(value: datetime):
+    """A date filter bound, compared the way the date columns are stored.
+
+    SQLite keeps server-default timestamps as "YYYY-MM-DD HH:MM:SS" text and
+    compares them as strings. A bound datetime is written with ".000000"
+    appended, which sorts after the equal stored value and would move rows on
+    the boundary second across it. Whole seconds are bound in the stored form.
+    """
+    if IS_SQLITE and not value.microsecond:
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return value
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+async def export_rows(dataset: Dataset, fmt: str, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None, status: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Encoded rows of a dataset, one chunk per batch fetched, with its own session.
+
+    The query runs on a server-side cursor (yield_per), so only one batch of
+    plain row tuples is held at a time however large the export is.
+    """
+    fields = dataset.fields
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(fields)
+    async with AsyncSessionLocal() as db:
+        location_names = {location.id: location.name for location in await location_cache.all(db)}
+        result = await db.stream(
+            dataset.query(since, until, status).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            for row in rows:
+                values = [_value(value) for value in row]
+                if len(values) < len(fields):
+                    values.append(location_names.get(row.location_id))
+                if fmt == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(fields, values))) + "\n")
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
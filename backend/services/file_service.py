@@ -1,46 +1,318 @@
 import os
+import re
 import uuid
-import shutil
+import hashlib
+import asyncio
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from fastapi import UploadFile
+from sqlalchemy import event, select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import imagehash
-from PIL import Image
+from PIL import Image, ImageOps
+
+from database import dialect_insert
+from models import StoredBlob
+from .storage import LocalStorage, storage_from_env
+from .thumbnails import generate_derivatives
+
+CHUNK_SIZE = 1024 * 1024
+# Storage key of an upload: the SHA-256 of its bytes, under a two-character fan-out directory
+PHOTO_KEY = re.compile(r"[0-9a-f]{2}/[0-9a-f]{64}\.(?:jpg|png|gif|webp)")
+
+# Keys that save_photo has handed out in this process and whose references are not
+# committed yet. Identical uploads share one staged file, so it is only removed once
+# no request is still about to point a row at it.
+_pending_keys: Counter = Counter()
+
+def _release_pending(keys):
+    for key in keys:
+        _pending_keys[key] -= 1
+        if _pending_keys[key] <= 0:
+            del _pending_keys[key]
+
+class PhotoTooLarge(ValueError):
+    """An upload exceeded the per-photo size limit"""
+
+class UnsupportedPhoto(ValueError):
+    """An upload is not an image format the photo pipeline handles"""
+
+def sniff_photo_type(head: bytes) -> Optional[str]:
+    """File extension for an upload's leading bytes; the client-supplied name is not trusted"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def _write_chunk(buffer, digest, chunk: bytes):
+    buffer.write(chunk)
+    digest.update(chunk)
+
+def decodes(image_path: str) -> bool:
+    """Whether an image file decodes in full; runs in a worker process"""
+    try:
+        with Image.open(image_path) as img:
+            img.load()
+        return True
+    except Exception:
+        return False
+
+def process_photo(image_path: str, derived_dir: str, derived_url: str) -> Optional[Dict]:
+    """Strip EXIF metadata in place, render thumbnails and hash the photo.
+
+    Runs in a worker process. The pixel orientation EXIF describes is applied
+    before the metadata (including GPS location) is dropped. Returns the
+    perceptual hash, the SHA-256 of the stored file and the derivative URLs.
+    """
+    try:
+        with Image.open(image_path) as img:
+            if img.getexif():
+                image_format = img.format
+                stripped = ImageOps.exif_transpose(img)
+                tmp_path = image_path + ".tmp"
+                save_options = {"quality": 95} if image_format == "JPEG" else {}
+                stripped.save(tmp_path, format=image_format, **save_options)
+                os.replace(tmp_path, image_path)
+                img = stripped
+            with open(image_path, "rb") as f:
+                content_hash = hashlib.file_digest(f, "sha256").hexdigest()
+            return {
+                "phash": str(imagehash.phash(img)),
+                "content_hash": content_hash,
+                "derivatives": generate_derivatives(img, content_hash, Path(derived_dir), derived_url),
+            }
+    except Exception as e:
+        print(f"Error processing photo {image_path}: {e}")
+        return None
+
+def compute_phash(image_path: str) -> Optional[str]:
+    """Perceptual hash of an image file; runs in a worker process"""
+    try:
+        with Image.open(image_path) as img:
+            return str(imagehash.phash(img))
+    except Exception as e:
+        print(f"Error computing phash: {e}")
+        return None
 
 class FileService:
     def __init__(self):
         self.upload_dir = Path("uploads")
         self.upload_dir.mkdir(exist_ok=True)
+        self.storage = storage_from_env(self.upload_dir)
+        # Uploads wait here, unserved, until their EXIF metadata has been stripped
+        self.staging_dir = Path(os.getenv("UPLOAD_STAGING_DIR", "uploads_staging"))
+        self.staging_dir.mkdir(exist_ok=True)
+        # Content-addressed thumbnails are published next to the originals. Remote
+        # storage gets them uploaded from a local scratch directory.
+        if isinstance(self.storage, LocalStorage):
+            self.derived_dir = self.upload_dir / "derived"
+        else:
+            self.derived_dir = self.staging_dir / "derived"
+        self.max_photo_bytes = int(float(os.getenv("MAX_PHOTO_SIZE_MB", "10")) * 1024 * 1024)
+        self.photo_workers = int(os.getenv("PHOTO_WORKERS", "2"))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Photos being processed, by storage key, so identical uploads share one run
+        self._processing: Dict[str, asyncio.Future] = {}
+    
+    def photo_key(self, photo_url: str) -> Optional[str]:
+        """Storage key of an uploaded photo's URL; None for any other URL.
+        
+        Only content addresses are accepted, since lost reports carry
+        client-supplied URLs that must not name other files.
+        """
+        key = self.storage.key_from_url(photo_url)
+        return key if key is not None and PHOTO_KEY.fullmatch(key) else None
+    
+    async def save_photo(self, photo: UploadFile) -> str:
+        """Stream an upload to the staging area, hashing it on the way, and return its content-addressed URL"""
+        tmp_path = self.staging_dir / f"upload-{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        extension = None
+        
+        # Reads, writes and hashing run on worker threads, and the size limit is checked per chunk
+        buffer = await run_in_threadpool(open, tmp_path, "wb")
+        try:
+            written = 0
+            while chunk := await photo.read(CHUNK_SIZE):
+                if extension is None:
+                    extension = sniff_photo_type(chunk)
+                    if extension is None:
+                        raise UnsupportedPhoto(f"{photo.filename} is not a JPEG, PNG, GIF or WebP image")
+                written += len(chunk)
+                if written > self.max_photo_bytes:
+                    raise PhotoTooLarge(
+                        f"{photo.filename} exceeds the {self.max_photo_bytes // (1024 * 1024)} MB photo limit"
+                    )
+                await run_in_threadpool(_write_chunk, buffer, digest, chunk)
+            if extension is None:
+                raise UnsupportedPhoto(f"{photo.filename} is empty")
+        except BaseException:
+            await run_in_threadpool(buffer.close)
+            tmp_path.unlink(missing_ok=True)
+            raise
+        await run_in_threadpool(buffer.close)
+        
+        # Identical bytes get the same key, so a photo already stored or staged is not written again
+        content_hash = digest.hexdigest()
+        key = f"{content_hash[:2]}/{content_hash}.{extension}"
+        staged_path = self.staging_dir / key
+        # Held until the caller's retain() commits or discard_upload() gives it back
+        _pending_keys[key] += 1
+        try:
+            if staged_path.exists() or await self.storage.exists(key):
+                tmp_path.unlink()
+            else:
+                # A file with an image signature but a corrupt body would never be published
+                loop = asyncio.get_running_loop()
+                if not await loop.run_in_executor(self._executor(), decodes, str(tmp_path)):
+                    tmp_path.unlink(missing_ok=True)
+                    raise UnsupportedPhoto(f"{photo.filename} could not be decoded as an image")
+                staged_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, staged_path)
+        except BaseException:
+            _release_pending([key])
+            raise
+        return self.storage.url(key)
+    
+    async def retain(self, db: AsyncSession, photo_urls: List[str]):
+        """Count new references to stored photos; commits with the caller's transaction"""
+        counts = Counter(self.photo_key(url) for url in photo_urls)
+        counts.pop(None, None)
+        if not counts:
+            return
+        insert = dialect_insert(StoredBlob)
+        await db.execute(
+            insert.on_conflict_do_update(
+                index_elements=[StoredBlob.key],
+                set_={"refcount": StoredBlob.refcount + insert.excluded.refcount}
+            ),
+            [{"key": key, "refcount": count} for key, count in counts.items()]
+        )
+        # The uploads stay held until the refcounts are committed (or rolled back)
+        db.sync_session.info.setdefault("retained_photo_keys", []).extend(counts.elements())
     
-    async def save_photo(self, photo: UploadFile, item_id: str) -> str:
-        """Save uploaded photo and return URL"""
-        # Generate unique filename
-        file_extension = photo.filename.split('.')[-1] if photo.filename else 'jpg'
-        filename = f"{item_id}_{uuid.uuid4().hex}.{file_extension}"
-        file_path = self.upload_dir / filename
+    async def discard_upload(self, db: AsyncSession, photo_url: str):
+        """Give back an upload no row ended up referencing, e.g. after a failed create.
         
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(photo.file, buffer)
+        The staged file is removed unless a stored row or another request's
+        pending upload of the same bytes still needs it.
+        """
+        key = self.photo_key(photo_url)
+        if key is None:
+            return
+        _release_pending([key])
+        if _pending_keys[key]:
+            return
+        stored = await db.scalar(select(StoredBlob.key).where(StoredBlob.key == key))
+        # Checked again after the query: an identical upload may have arrived meanwhile
+        if stored is None and not _pending_keys[key]:
+            (self.staging_dir / key).unlink(missing_ok=True)
+    
+    def _source_path(self, key: str) -> Tuple[Optional[Path], bool]:
+        """Local file holding a photo's bytes, and whether it is still staged"""
+        staged_path = self.staging_dir / key
+        if staged_path.exists():
+            return staged_path, True
+        local_path = self.storage.local_path(key)
+        if local_path is not None and local_path.is_file():
+            return local_path, False
+        return None, False
+    
+    async def process_photo(self, photo_url: str) -> Optional[Dict]:
+        """Strip EXIF, render thumbnails and hash a photo in the bounded process pool, then publish it.
         
-        # Return URL path
-        return f"/uploads/{filename}"
+        Returns None if the photo failed to process, or if it is already
+        published to remote storage (identical uploads take the results
+        recorded for the first one).
+        """
+        key = self.photo_key(photo_url)
+        if key is None:
+            return None
+        if key not in self._processing:
+            self._processing[key] = asyncio.ensure_future(self._process(key))
+            self._processing[key].add_done_callback(lambda _: self._processing.pop(key, None))
+        return await asyncio.shield(self._processing[key])
+    
+    async def _process(self, key: str) -> Optional[Dict]:
+        source_path, staged = self._source_path(key)
+        if source_path is None:
+            return None
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self._executor(), process_photo, str(source_path), str(self.derived_dir), self.storage.url("derived")
+        )
+        if result is None:
+            return None
+        if staged:
+            await self.storage.put_file(key, source_path)
+        if not isinstance(self.storage, LocalStorage):
+            for url in result["derivatives"].values():
+                derivative_key = self.storage.key_from_url(url)
+                derivative_path = self.derived_dir / derivative_key.split("/", 1)[1]
+                if derivative_path.exists():
+                    await self.storage.put_file(derivative_key, derivative_path)
+        return result
+    
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs database driver threads is not safe
+            self._pool = ProcessPoolExecutor(self.photo_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
     
     def compute_phash(self, image_path: str) -> str:
         """Compute perceptual hash for image deduplication"""
-        try:
-            with Image.open(image_path) as img:
-                hash_value = imagehash.phash(img)
-                return str(hash_value)
-        except Exception as e:
-            print(f"Error computing phash: {e}")
+        return compute_phash(image_path)
+    
+    async def photo_phash(self, photo_url: str) -> Optional[str]:
+        """Perceptual hash of a stored upload, computed in the process pool; None for other URLs"""
+        key = self.photo_key(photo_url)
+        path = self._source_path(key)[0] if key is not None else None
+        if path is None:
             return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), compute_phash, str(path))
     
-    def delete_photo(self, photo_url: str):
-        """Delete photo file"""
+    async def delete_photo(self, db: AsyncSession, photo_url: str):
+        """Drop one reference to a stored photo, deleting the file along with the last one"""
+        key = self.photo_key(photo_url)
+        if key is None:
+            return
+        remaining = await db.scalar(
+            update(StoredBlob)
+            .where(StoredBlob.key == key)
+            .values(refcount=StoredBlob.refcount - 1)
+            .returning(StoredBlob.refcount)
+        )
+        if remaining is not None and remaining > 0:
+            await db.commit()
+            return
+        await db.execute(delete(StoredBlob).where(StoredBlob.key == key, StoredBlob.refcount <= 0))
+        await db.commit()
+        if _pending_keys[key]:
+            # An identical upload is about to reference the file again
+            return
         try:
-            filename = photo_url.split('/')[-1]
-            file_path = self.upload_dir / filename
-            if file_path.exists():
-                file_path.unlink()
+            await self.storage.delete(key)
+            (self.staging_dir / key).unlink(missing_ok=True)
         except Exception as e:
-            print(f"Error deleting photo: {e}")
\ No newline at end of file
+            print(f"Error deleting photo: {e}")
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _release_retained_photos(session):
+    _release_pending(session.info.pop("retained_photo_keys", ()))
@@ -1,40 +1,50 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import datetime
-import os
+import json
+import asyncio
 import uuid
 import random
 import string
 
-from models import ItemFound, ItemLost, ItemPhoto, Claim, User, Location
+from database import AsyncSessionLocal
+from models import ItemFound, ItemLost, ItemPhoto, Claim
 from schemas import ItemFoundCreate, ItemLostCreate, ClaimCreate, StatsResponse
 from .file_service import FileService
+from .query_options import FOUND_ITEM_LOADERS, found_item_loaders
+from .pagination import keyset_page
+from .search import full_text_search
+from .stats_counters import StatsCounters, aggregate_counts
+from .token_index import TokenIndex
+from .term_cache import found_terms, serialize_terms
+from .tokenizer import tokenize
+from .embedding_service import EmbeddingService, pack_vector, unpack_vector
+from .bulk_import import manifest_uploads, photo_names
+from .ann_index import found_index, update_on_commit
+from .phash_index import phash_index
+from .reference_cache import location_cache
+from .user_resolver import user_resolver
 
 class ItemService:
     def __init__(self):
         self.file_service = FileService()
+        self.token_index = TokenIndex()
+        self.embeddings = EmbeddingService()
+        self.stats = StatsCounters()
     
-    async def create_found_item(self, db: Session, item_data: ItemFoundCreate, photos: List):
-        # Create or get user
-        user = db.query(User).filter(User.email == item_data.reporter_email).first()
-        if not user:
-            user = User(
-                email=item_data.reporter_email,
-                name=item_data.reporter_name,
-                role="office"
-            )
-            db.add(user)
-            db.flush()
-        
+    async def create_found_item(self, db: AsyncSession, item_data: ItemFoundCreate, photos: List):
         # Parse datetime
-        found_datetime = datetime.fromisoformat(item_data.found_date)
-        if item_data.found_time:
-            time_parts = item_data.found_time.split(':')
-            found_datetime = found_datetime.replace(
-                hour=int(time_parts[0]),
-                minute=int(time_parts[1])
-            )
+        found_datetime = self._found_at(item_data)
+        
+        # Stream photos to disk first, so an oversized upload is rejected before any row is written
+        # and no write transaction stays open while uploads stream in
+        photo_urls = await self._save_photos(db, photos)
+        text_embedding = await self.embeddings.encode_text(item_data.title + " " + item_data.description)
+        
+        # Create or get user
+        reporter_id = await user_resolver.resolve_id(db, item_data.reporter_email, item_data.reporter_name, "office")
         
         # Create item
         item = ItemFound(
@@ -42,91 +52,327 @@ class ItemService:
             description=item_data.description,
             category=item_data.category,
             location_id=item_data.location_id,
-            reporter_id=user.id,
-            found_at=found_datetime
+            reporter_id=reporter_id,
+            found_at=found_datetime,
+            search_terms=serialize_terms(tokenize(item_data.title + " " + item_data.description)),
+            text_embedding=text_embedding
         )
         db.add(item)
-        db.flush()
+        await db.flush()
+        await self.token_index.add_item(db, item)
+        await self.stats.item_created(db, item.status)
+        if found_index is not None:
+            update_on_commit(db, item.id, unpack_vector(item.text_embedding))
         
         # Handle photo uploads
-        for photo in photos:
-            if photo.filename:
-                photo_url = await self.file_service.save_photo(photo, item.id)
-                photo_record = ItemPhoto(
-                    item_id=item.id,
-                    url=photo_url
+        for photo_url in photo_urls:
+            photo_record = ItemPhoto(
+                item_id=item.id,
+                url=photo_url
+            )
+            db.add(photo_record)
+        await self.file_service.retain(db, photo_urls)
+        
+        await db.commit()
+        return await self._load_found_item(db, item.id)
+    
+    def _found_at(self, item_data: ItemFoundCreate) -> datetime:
+        """When an item was found; raises ValueError for a malformed date or a time other than HH:MM"""
+        found_datetime = datetime.fromisoformat(item_data.found_date)
+        if item_data.found_time:
+            try:
+                found_time = datetime.strptime(item_data.found_time, "%H:%M")
+            except ValueError:
+                raise ValueError(f"found_time {item_data.found_time!r} is not in HH:MM format")
+            found_datetime = found_datetime.replace(hour=found_time.hour, minute=found_time.minute)
+        return found_datetime
+    
+    async def import_found_items(self, db: AsyncSession, rows: List[dict], photo_source=None) -> List[dict]:
+        """Create a batch of found items from manifest rows in one transaction; returns a report per row.
+        
+        Rows that fail validation, or whose photos are missing or rejected, are
+        reported and skipped. Every row is validated and its photos stored
+        before the first write, and the rest are written with one batched
+        INSERT per table. Photo processing and matching are left to the
+        caller, so they can run once for the whole batch.
+        """
+        location_ids = {location.id for location in await location_cache.all(db)}
+        report, accepted = [], []
+        for number, row in enumerate(rows, start=1):
+            try:
+                item_data = ItemFoundCreate(**{field: row.get(field) for field in ItemFoundCreate.model_fields})
+                if item_data.location_id not in location_ids:
+                    raise ValueError(f"Unknown location_id {item_data.location_id}")
+                found_at = self._found_at(item_data)
+                photo_urls = await self._save_photos(
+                    db, manifest_uploads(photo_source, photo_names(row.get("photos")))
                 )
-                db.add(photo_record)
+            except ValueError as e:
+                report.append({"row": number, "status": "error", "error": str(e)})
+                continue
+            accepted.append((number, item_data, found_at, photo_urls))
+        if not accepted:
+            return report
         
-        db.commit()
-        db.refresh(item)
-        return item
+        texts = [item_data.title + " " + item_data.description for _, item_data, _, _ in accepted]
+        vectors = await run_in_threadpool(self.embeddings.embed_texts, texts)
+        # One get-or-create per reporter, however many rows they filed
+        reporter_ids = {}
+        for _, item_data, _, _ in accepted:
+            if item_data.reporter_email not in reporter_ids:
+                reporter_ids[item_data.reporter_email] = await user_resolver.resolve_id(
+                    db, item_data.reporter_email, item_data.reporter_name, "office"
+                )
+        items, photo_rows = [], []
+        for (number, item_data, found_at, photo_urls), vector in zip(accepted, vectors):
+            item = ItemFound(
+                id=str(uuid.uuid4()),
+                title=item_data.title,
+                description=item_data.description,
+                category=item_data.category,
+                location_id=item_data.location_id,
+                reporter_id=reporter_ids[item_data.reporter_email],
+                found_at=found_at,
+                status="available",
+                search_terms=serialize_terms(tokenize(item_data.title + " " + item_data.description)),
+                text_embedding=pack_vector(vector)
+            )
+            items.append(item)
+            photo_rows.extend({"id": str(uuid.uuid4()), "item_id": item.id, "url": url} for url in photo_urls)
+            report.append({"row": number, "status": "created", "id": item.id, "photos": len(photo_urls)})
+        report.sort(key=lambda entry: entry["row"])
+        
+        columns = ("id", "title", "description", "category", "location_id", "reporter_id",
+                   "found_at", "status", "search_terms", "text_embedding")
+        await db.execute(insert(ItemFound), [{column: getattr(item, column) for column in columns} for item in items])
+        if photo_rows:
+            await db.execute(insert(ItemPhoto), photo_rows)
+            await self.file_service.retain(db, [photo["url"] for photo in photo_rows])
+        await self.token_index.add_items(db, items)
+        await self.stats.item_created(db, "available", len(items))
+        await db.commit()
+        
+        if found_index is not None:
+            for item, vector in zip(items, vectors):
+                found_index.add(item.id, vector)
+        return report
     
-    async def get_found_items(self, db: Session, status: Optional[str] = None, 
-                            category: Optional[str] = None, location_id: Optional[int] = None,
-                            skip: int = 0, limit: int = 100):
-        query = db.query(ItemFound)
+    async def _save_photos(self, db: AsyncSession, photos: List) -> List[str]:
+        """Save uploads one by one, removing the ones already written if any of them fails"""
+        photo_urls = []
+        try:
+            for photo in photos:
+                if photo.filename:
+                    photo_urls.append(await self.file_service.save_photo(photo))
+        except BaseException:
+            for photo_url in photo_urls:
+                await self.file_service.discard_upload(db, photo_url)
+            raise
+        return photo_urls
+    
+    async def process_photos_job(self, item_ids: List[str]):
+        """Background EXIF stripping, thumbnailing and hashing of items' new photos, with its own session"""
+        async with AsyncSessionLocal() as db:
+            try:
+                photos = (await db.scalars(
+                    select(ItemPhoto).where(ItemPhoto.item_id.in_(item_ids), ItemPhoto.content_hash.is_(None))
+                )).all()
+                # The same bytes uploaded again are stored once; reuse what was recorded for them
+                processed = {
+                    photo.url: {"phash": photo.phash, "content_hash": photo.content_hash, "derivatives": photo.thumbnails}
+                    for photo in (await db.scalars(
+                        select(ItemPhoto).where(
+                            ItemPhoto.url.in_([photo.url for photo in photos]),
+                            ItemPhoto.content_hash.isnot(None)
+                        )
+                    )).all()
+                }
+                pending = list(dict.fromkeys(photo.url for photo in photos if photo.url not in processed))
+                results = await asyncio.gather(*(self.file_service.process_photo(url) for url in pending))
+                processed.update(zip(pending, results))
+                hashed = []
+                for photo in photos:
+                    result = processed.get(photo.url)
+                    if result is None:
+                        continue
+                    photo.phash = result["phash"]
+                    photo.content_hash = result["content_hash"]
+                    photo.derivatives = json.dumps(result["derivatives"])
+                    # Flag the same object logged twice, e.g. from two different desks or twice in one batch
+                    duplicates = phash_index.near(photo.phash, exclude_item_id=photo.item_id) + [
+                        (distance, other.id, other.item_id)
+                        for other in hashed if other.item_id != photo.item_id
+                        for distance in [(int(photo.phash, 16) ^ int(other.phash, 16)).bit_count()]
+                        if distance <= phash_index.radius
+                    ]
+                    if duplicates:
+                        photo.duplicate_of = min(duplicates)[1]
+                    hashed.append(photo)
+                await db.commit()
+                for photo in hashed:
+                    phash_index.add(photo.id, photo.item_id, photo.phash)
+            except Exception as e:
+                await db.rollback()
+                print(f"Error processing photos for items {', '.join(item_ids)}: {e}")
+    
+    async def backfill_photos(self, batch_size: int = 20):
+        """Process photos stored before thumbnails existed, a few items at a time"""
+        async with AsyncSessionLocal() as db:
+            item_ids = (await db.scalars(
+                select(ItemPhoto.item_id).where(ItemPhoto.content_hash.is_(None)).distinct()
+            )).all()
+        for start in range(0, len(item_ids), batch_size):
+            await self.process_photos_job(item_ids[start:start + batch_size])
+    
+    def _found_items_query(self, status: Optional[str], category: Optional[str],
+                           location_id: Optional[int]):
+        query = select(ItemFound).options(*FOUND_ITEM_LOADERS)
         
         if status:
-            query = query.filter(ItemFound.status == status)
+            query = query.where(ItemFound.status == status)
         if category:
-            query = query.filter(ItemFound.category == category)
+            query = query.where(ItemFound.category == category)
         if location_id:
-            query = query.filter(ItemFound.location_id == location_id)
+            query = query.where(ItemFound.location_id == location_id)
         
-        return query.offset(skip).limit(limit).all()
+        return query
     
-    async def get_found_item(self, db: Session, item_id: str):
-        return db.query(ItemFound).filter(ItemFound.id == item_id).first()
+    async def get_found_items(self, db: AsyncSession, status: Optional[str] = None, 
+                            category: Optional[str] = None, location_id: Optional[int] = None,
+                            skip: int = 0, limit: int = 100):
+        query = self._found_items_query(status, category, location_id).offset(skip).limit(limit)
+        items = (await db.scalars(query)).all()
+        await location_cache.attach(db, items)
+        return items
+    
+    async def search_found_items(self, db: AsyncSession, text: str, status: Optional[str] = None,
+                                 category: Optional[str] = None, location_id: Optional[int] = None,
+                                 skip: int = 0, limit: int = 20):
+        """Found items matching text through the full-text index, most relevant first"""
+        query = full_text_search(self._found_items_query(status, category, location_id), text)
+        items = (await db.scalars(query.offset(skip).limit(limit))).all()
+        await location_cache.attach(db, items)
+        return items
+    
+    async def get_found_items_page(self, db: AsyncSession, status: Optional[str] = None,
+                                   category: Optional[str] = None, location_id: Optional[int] = None,
+                                   cursor: str = "", limit: int = 100):
+        """Cursor pagination ordered by (created_at, id); returns (items, next_cursor)"""
+        query = self._found_items_query(status, category, location_id)
+        items, next_cursor = await keyset_page(db, query, ItemFound, ItemFound.created_at, cursor, limit)
+        await location_cache.attach(db, items)
+        return items, next_cursor
+    
+    async def get_found_item(self, db: AsyncSession, item_id: str):
+        item = await db.scalar(select(ItemFound).options(*FOUND_ITEM_LOADERS).where(ItemFound.id == item_id))
+        await location_cache.attach(db, [item])
+        return item
+    
+    async def get_possible_duplicates(self, db: AsyncSession, item_id: str) -> List[ItemFound]:
+        """Other found items with a photo within the near-duplicate distance of one of this item's photos"""
+        hashes = (await db.scalars(
+            select(ItemPhoto.phash).where(ItemPhoto.item_id == item_id, ItemPhoto.phash.isnot(None))
+        )).all()
+        nearest = {}
+        for phash in hashes:
+            for distance, _, other_item_id in phash_index.near(phash, exclude_item_id=item_id):
+                nearest[other_item_id] = min(distance, nearest.get(other_item_id, distance))
+        if not nearest:
+            return []
+        items = (await db.scalars(
+            select(ItemFound).options(*FOUND_ITEM_LOADERS).where(ItemFound.id.in_(list(nearest)))
+        )).all()
+        await location_cache.attach(db, items)
+        return sorted(items, key=lambda item: nearest[item.id])
     
-    async def update_item_status(self, db: Session, item_id: str, status: str):
-        item = db.query(ItemFound).filter(ItemFound.id == item_id).first()
+    async def _load_found_item(self, db: AsyncSession, item_id: str):
+        """Reload a just-committed item with everything its response nests"""
+        item = await db.scalar(
+            select(ItemFound)
+            .options(*FOUND_ITEM_LOADERS)
+            .where(ItemFound.id == item_id)
+            .execution_options(populate_existing=True)
+        )
+        await location_cache.attach(db, [item])
+        return item
+    
+    async def update_item_status(self, db: AsyncSession, item_id: str, status: str):
+        item = await db.scalar(select(ItemFound).where(ItemFound.id == item_id))
         if item:
-            item.status = status
-            db.commit()
-            db.refresh(item)
+            await self._set_status(db, item, status)
+            await db.commit()
+            item = await self._load_found_item(db, item_id)
         return item
     
-    async def create_lost_item(self, db: Session, item_data: ItemLostCreate):
-        # Create or get user
-        user = db.query(User).filter(User.email == item_data.reporter_email).first()
-        if not user:
-            user = User(
-                email=item_data.reporter_email,
-                name=item_data.reporter_name,
-                role="student"
-            )
-            db.add(user)
-            db.flush()
+    async def _set_status(self, db: AsyncSession, item: ItemFound, status: str):
+        """Change an item's status and keep the matching indexes and term cache in step.
         
+        The in-memory ANN index only changes once the transaction commits.
+        """
+        previous_status = item.status
+        item.status = status
+        await self.token_index.sync_status(db, item, previous_status)
+        await self.stats.item_status_changed(db, previous_status, status)
+        if status != "available":
+            found_terms.invalidate(item.id)
+        if found_index is not None and previous_status != status:
+            if status == "available" and item.text_embedding is not None:
+                update_on_commit(db, item.id, unpack_vector(item.text_embedding))
+            elif previous_status == "available":
+                update_on_commit(db, item.id, None)
+    
+    async def create_lost_item(self, db: AsyncSession, item_data: ItemLostCreate):
         # Parse datetime
         last_seen_datetime = datetime.fromisoformat(item_data.last_seen_at)
         
+        # Reads and the embedding come before a new reporter's INSERT opens the write transaction
+        photo_phash = await self._known_phash(db, item_data.photo_url)
+        text_embedding = await self.embeddings.encode_text(item_data.title + " " + item_data.description)
+        
+        # Create or get user
+        reporter_id = await user_resolver.resolve_id(db, item_data.reporter_email, item_data.reporter_name)
+        
         # Create item
         item = ItemLost(
             title=item_data.title,
             description=item_data.description,
             last_seen_location_id=item_data.last_seen_location_id,
             last_seen_at=last_seen_datetime,
-            reporter_id=user.id,
-            photo_url=item_data.photo_url
+            reporter_id=reporter_id,
+            photo_url=item_data.photo_url,
+            photo_phash=photo_phash,
+            text_embedding=text_embedding
         )
         db.add(item)
-        db.commit()
-        db.refresh(item)
+        await db.commit()
+        await db.refresh(item, ["created_at"])
+        await location_cache.attach(db, [item], "last_seen_location")
         return item
     
-    async def create_claim(self, db: Session, claim_data: ClaimCreate):
+    async def _known_phash(self, db: AsyncSession, photo_url: Optional[str]) -> Optional[str]:
+        """Hash already computed for a stored photo with this URL, if any"""
+        if not photo_url:
+            return None
+        return await db.scalar(
+            select(ItemPhoto.phash).where(ItemPhoto.url == photo_url, ItemPhoto.phash.isnot(None)).limit(1)
+        )
+    
+    async def hash_lost_photo_job(self, lost_item_id: str):
+        """Background hashing of a lost report's uploaded photo, with its own session"""
+        async with AsyncSessionLocal() as db:
+            try:
+                item = await db.scalar(select(ItemLost).where(ItemLost.id == lost_item_id))
+                if not item or not item.photo_url or item.photo_phash:
+                    return
+                item.photo_phash = await self.file_service.photo_phash(item.photo_url)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                print(f"Error hashing photo for lost item {lost_item_id}: {e}")
+    
+    async def create_claim(self, db: AsyncSession, claim_data: ClaimCreate):
         # Create or get user
-        user = db.query(User).filter(User.email == claim_data.claimant_email).first()
-        if not user:
-            user = User(
-                email=claim_data.claimant_email,
-                name=claim_data.claimant_name,
-                role="student"
-            )
-            db.add(user)
-            db.flush()
+        claimant_id = await user_resolver.resolve_id(db, claim_data.claimant_email, claim_data.claimant_name)
         
         # Generate hold code
         hold_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
@@ -134,60 +380,86 @@ class ItemService:
         # Create claim
         claim = Claim(
             found_id=claim_data.found_id,
-            claimant_id=user.id,
+            claimant_id=claimant_id,
             hold_code=hold_code
         )
         db.add(claim)
+        await db.flush()
+        await self.stats.claim_status_changed(db, None, claim.status)
         
         # Update item status to on_hold
-        item = db.query(ItemFound).filter(ItemFound.id == claim_data.found_id).first()
+        item = await db.scalar(select(ItemFound).where(ItemFound.id == claim_data.found_id))
         if item:
-            item.status = "on_hold"
+            await self._set_status(db, item, "on_hold")
         
-        db.commit()
-        db.refresh(claim)
+        await db.commit()
+        claim = await db.scalar(
+            self._claims_query(None)
+            .where(Claim.id == claim.id)
+            .execution_options(populate_existing=True)
+        )
+        await location_cache.attach(db, [claim.found_item])
         return claim
     
-    async def get_claims(self, db: Session, status: Optional[str] = None, skip: int = 0, limit: int = 100):
-        query = db.query(Claim)
+    def _claims_query(self, status: Optional[str]):
+        query = select(Claim).options(*found_item_loaders(Claim.found_item))
         if status:
-            query = query.filter(Claim.status == status)
-        return query.offset(skip).limit(limit).all()
+            query = query.where(Claim.status == status)
+        return query
+    
+    async def get_claims(self, db: AsyncSession, status: Optional[str] = None, skip: int = 0, limit: int = 100):
+        claims = (await db.scalars(self._claims_query(status).offset(skip).limit(limit))).all()
+        await location_cache.attach(db, [claim.found_item for claim in claims])
+        return claims
     
-    async def verify_claim(self, db: Session, claim_id: str, verification):
-        claim = db.query(Claim).filter(Claim.id == claim_id).first()
+    async def get_claims_page(self, db: AsyncSession, status: Optional[str] = None, cursor: str = "", limit: int = 100):
+        """Cursor pagination ordered by (requested_at, id); returns (claims, next_cursor)"""
+        claims, next_cursor = await keyset_page(db, self._claims_query(status), Claim, Claim.requested_at, cursor, limit)
+        await location_cache.attach(db, [claim.found_item for claim in claims])
+        return claims, next_cursor
+    
+    async def verify_claim(self, db: AsyncSession, claim_id: str, verification):
+        claim = await db.scalar(select(Claim).where(Claim.id == claim_id))
         if claim:
+            previous_status = claim.status
             if verification.verified:
                 claim.status = "verified"
                 claim.verified_at = datetime.utcnow()
                 claim.verifier_id = verification.verifier_id
+                if previous_status != "verified":
+                    await self.stats.claim_verified(db, claim)
             else:
                 claim.status = "rejected"
+                if previous_status == "verified":
+                    await self.stats.claim_verified(db, claim, verified=False)
                 # Return item to available status
-                item = db.query(ItemFound).filter(ItemFound.id == claim.found_id).first()
+                item = await db.scalar(select(ItemFound).where(ItemFound.id == claim.found_id))
                 if item:
-                    item.status = "available"
+                    await self._set_status(db, item, "available")
+            await self.stats.claim_status_changed(db, previous_status, claim.status)
             
-            db.commit()
-            db.refresh(claim)
+            await db.commit()
+            await db.refresh(claim)
         return claim
     
-    async def get_locations(self, db: Session):
-        return db.query(Location).all()
+    async def get_locations(self, db: AsyncSession):
+        return await location_cache.all(db)
     
-    async def get_stats(self, db: Session) -> StatsResponse:
-        total_items = db.query(ItemFound).count()
-        available_items = db.query(ItemFound).filter(ItemFound.status == "available").count()
-        on_hold_items = db.query(ItemFound).filter(ItemFound.status == "on_hold").count()
-        claimed_items = db.query(ItemFound).filter(ItemFound.status == "claimed").count()
-        pending_claims = db.query(Claim).filter(Claim.status == "requested").count()
+    async def get_stats(self, db: AsyncSession) -> StatsResponse:
+        # O(1) read of maintained counters, or a single aggregation over all statuses
+        counts = await self.stats.read(db) if self.stats.enabled else await aggregate_counts(db)
+        claimed_items = counts["items:claimed"]
+        
+        # Share of verified claims, by people who filed a lost report, that came through a suggested match
+        reported = counts["accuracy:reported"]
+        match_accuracy = counts["accuracy:matched"] / reported if reported else 0.0
         
         return StatsResponse(
-            total_items=total_items,
-            available_items=available_items,
-            on_hold_items=on_hold_items,
+            total_items=counts["items:total"],
+            available_items=counts["items:available"],
+            on_hold_items=counts["items:on_hold"],
             claimed_items=claimed_items,
-            pending_claims=pending_claims,
+            pending_claims=counts["claims:requested"],
             items_reunited=claimed_items,  # Simplified for MVP
-            match_accuracy=0.89  # Mock value for MVP
-        )
\ No newline at end of file
+            match_accuracy=round(match_accuracy, 4)
+        )
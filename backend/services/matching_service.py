@@ -1,60 +1,316 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from typing import List
-import re
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, FrozenSet, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
+import os
+import uuid
+import numpy as np
+from starlette.concurrency import run_in_threadpool
 
-from models import ItemFound, ItemLost, Match
+from database import AsyncSessionLocal, dialect_insert
+from models import ItemFound, ItemLost, ItemPhoto, Match
+from .token_index import TokenIndex
+from .term_cache import found_terms, lost_terms
+from .batch_scorer import BatchScorer
+from .embedding_service import EmbeddingService, unpack_vector, unpack_matrix
+from .ann_index import found_index
+from .phash_index import phash_index
+from .reference_cache import location_cache
+from .query_options import found_item_loaders
+
+MATCH_THRESHOLD = 0.3  # Threshold for suggesting matches
 
 class MatchingService:
     def __init__(self):
-        pass
+        self.token_index = TokenIndex()
+        self.batch_scorer = BatchScorer()
+        # "batch" scores all candidates in one NumPy pass, "python" scores them one by one
+        self.engine = os.getenv("MATCHING_ENGINE", "batch")
+        # "heuristic" uses term overlap, location and time; "hybrid" blends in embedding similarity
+        self.mode = os.getenv("MATCHING_MODE", "heuristic")
+        self.embedding_weight = float(os.getenv("EMBEDDING_WEIGHT", "0.5"))
+        self.ann_candidates = int(os.getenv("ANN_CANDIDATES", "200"))
+        # Photo similarity is added to the score: full weight for identical phashes,
+        # nothing once they are PHOTO_MATCH_DISTANCE or more bits apart
+        self.photo_weight = float(os.getenv("PHOTO_WEIGHT", "0.4"))
+        self.photo_match_distance = int(os.getenv("PHOTO_MATCH_DISTANCE", "12"))
+        # Lost reports older than this are no longer considered by reverse matching
+        self.open_report_days = int(os.getenv("OPEN_LOST_REPORT_DAYS", "90"))
+        self.embeddings = EmbeddingService()
+    
+    async def prepare(self, db: AsyncSession):
+        """Bring derived matching data up to date on startup"""
+        await self.token_index.ensure_built(db)
+        if self.mode == "hybrid":
+            await self.embeddings.backfill(db)
+            if found_index is not None:
+                await self._load_found_index(db)
+    
+    async def _load_found_index(self, db: AsyncSession):
+        """Restore the ANN snapshot, bringing it up to date with items created or re-statused since"""
+        query = select(ItemFound.id, ItemFound.text_embedding).where(
+            ItemFound.status == "available",
+            ItemFound.text_embedding.isnot(None)
+        )
+        if found_index.load():
+            # Items claimed, held or made available again since the snapshot flip alive flags,
+            # and only the available items the snapshot lacks need their vectors read
+            available = (await db.scalars(
+                select(ItemFound.id).where(ItemFound.status == "available", ItemFound.text_embedding.isnot(None))
+            )).all()
+            missing = list(found_index.reconcile(available))
+            for start in range(0, len(missing), 500):
+                rows = await db.execute(query.where(ItemFound.id.in_(missing[start:start + 500])))
+                for item_id, embedding in rows:
+                    found_index.add(item_id, unpack_vector(embedding))
+        else:
+            async for item_id, embedding in await db.stream(query.execution_options(yield_per=1000)):
+                found_index.add(item_id, unpack_vector(embedding))
+        await run_in_threadpool(found_index.save)
     
-    async def find_matches(self, db: Session, lost_item_id: str) -> List[Match]:
+    async def find_matches(self, db: AsyncSession, lost_item_id: str) -> List[Match]:
         """Find potential matches for a lost item using keyword matching"""
-        lost_item = db.query(ItemLost).filter(ItemLost.id == lost_item_id).first()
+        lost_item = await db.scalar(select(ItemLost).where(ItemLost.id == lost_item_id))
         if not lost_item:
             return []
         
-        # Get candidate found items (same category if possible, within last 30 days)
-        candidates_query = db.query(ItemFound).filter(
+        # Only items sharing a term with the report can score on text. Items with no
+        # shared term can still clear the threshold on location + time alone
+        # (0.2 + 0.1 sums to just over 0.3), which requires the same location and
+        # a time difference of at most seven whole days.
+        same_place_and_week = and_(
+            ItemFound.location_id == lost_item.last_seen_location_id,
+            ItemFound.found_at >= lost_item.last_seen_at - timedelta(days=7),
+            ItemFound.found_at < lost_item.last_seen_at + timedelta(days=8)
+        )
+        query_terms = lost_terms.get(lost_item)
+        sharing_terms = self.token_index.candidate_ids(query_terms)
+        if sharing_terms is not None:
+            candidate_filter = or_(ItemFound.id.in_(sharing_terms), same_place_and_week)
+        else:
+            candidate_filter = same_place_and_week
+        
+        # Get candidate found items (within last 30 days)
+        candidates_query = select(ItemFound).where(
             ItemFound.status == "available",
             ItemFound.found_at >= lost_item.last_seen_at - timedelta(days=30)
         )
+        if self.mode == "hybrid" and lost_item.text_embedding is not None:
+            # Semantic matches need not share any term, so add the nearest neighbours by embedding
+            if found_index is not None:
+                neighbours = found_index.search(unpack_vector(lost_item.text_embedding), self.ann_candidates)
+                candidate_filter = or_(candidate_filter, ItemFound.id.in_([item_id for item_id, _ in neighbours]))
+            else:
+                candidate_filter = None
+        if candidate_filter is not None and lost_item.photo_phash and self.photo_weight > 0:
+            # A matching photo can carry an item that shares nothing else with the report
+            near_photos = phash_index.near(lost_item.photo_phash, radius=self.photo_match_distance - 1)
+            candidate_filter = or_(candidate_filter, ItemFound.id.in_({item_id for _, _, item_id in near_photos}))
+        if candidate_filter is not None:
+            candidates_query = candidates_query.where(candidate_filter)
+        
+        candidates = (await db.scalars(candidates_query)).all()
+        photo_similarity = None
+        if lost_item.photo_phash and self.photo_weight > 0 and candidates:
+            found_hashes = await self._found_photo_hashes(db, [item.id for item in candidates])
+            photo_similarity = self._photo_similarity(
+                [lost_item.photo_phash], [found_hashes.get(item.id, []) for item in candidates]
+            )
+        scored = self._score_candidates(lost_item, query_terms, candidates, photo_similarity)
+        return await self._record_matches(db, [(lost_item_id, found_item.id, score) for found_item, score in scored])
+    
+    async def match_found_item(self, db: AsyncSession, found_item_id: str) -> List[Match]:
+        """Reverse matching: score a newly found item against open lost reports"""
+        return await self.match_found_items(db, [found_item_id])
+    
+    async def match_found_items(self, db: AsyncSession, found_item_ids: List[str]) -> List[Match]:
+        """Reverse matching for a batch of new found items, sharing one read of the open reports"""
+        found_items = (await db.scalars(
+            select(ItemFound).where(ItemFound.id.in_(found_item_ids), ItemFound.status == "available")
+        )).all()
+        if not found_items:
+            return []
+        
+        # Mirror of the forward window: the found item must be within 30 days before last seen
+        open_reports = (await db.scalars(select(ItemLost).where(
+            ItemLost.created_at >= datetime.utcnow() - timedelta(days=self.open_report_days),
+            ItemLost.last_seen_at <= max(item.found_at for item in found_items) + timedelta(days=30)
+        ))).all()
+        if not open_reports:
+            return []
+        
+        found_hashes = {}
+        if self.photo_weight > 0:
+            found_hashes = await self._found_photo_hashes(db, [item.id for item in found_items])
+        scored_pairs = []
+        for found_item in found_items:
+            reports = [
+                report for report in open_reports
+                if report.last_seen_at <= found_item.found_at + timedelta(days=30)
+            ]
+            if not reports:
+                continue
+            photo_similarity = None
+            if found_hashes.get(found_item.id):
+                photo_similarity = self._photo_similarity(
+                    found_hashes[found_item.id],
+                    [[report.photo_phash] if report.photo_phash else [] for report in reports]
+                )
+            scored = self._score_lost_reports(found_item, reports, photo_similarity)
+            scored_pairs.extend((lost_item.id, found_item.id, score) for lost_item, score in scored)
+        return await self._record_matches(db, scored_pairs)
+    
+    async def find_matches_job(self, lost_item_id: str):
+        """Background entry point for forward matching, with its own session"""
+        async with AsyncSessionLocal() as db:
+            try:
+                await self.find_matches(db, lost_item_id)
+            except Exception as e:
+                await db.rollback()
+                print(f"Error matching lost item {lost_item_id}: {e}")
+    
+    async def match_found_item_job(self, found_item_id: str):
+        """Background entry point for reverse matching, with its own session"""
+        async with AsyncSessionLocal() as db:
+            try:
+                await self.match_found_item(db, found_item_id)
+            except Exception as e:
+                await db.rollback()
+                print(f"Error matching found item {found_item_id}: {e}")
+    
+    async def match_found_items_job(self, found_item_ids: List[str]):
+        """Background entry point for reverse matching of an imported batch, with its own session"""
+        async with AsyncSessionLocal() as db:
+            try:
+                await self.match_found_items(db, found_item_ids)
+            except Exception as e:
+                await db.rollback()
+                print(f"Error matching {len(found_item_ids)} imported found items: {e}")
+    
+    async def _record_matches(self, db: AsyncSession, scored_pairs: List[Tuple[str, str, float]]) -> List[Match]:
+        """Store (lost_id, found_id, score) suggestions that are not already recorded.
         
-        candidates = candidates_query.all()
-        matches = []
-        
-        for found_item in candidates:
-            score = self._calculate_similarity_score(lost_item, found_item)
-            if score > 0.3:  # Threshold for suggesting matches
-                # Check if match already exists
-                existing_match = db.query(Match).filter(
-                    and_(Match.lost_id == lost_item_id, Match.found_id == found_item.id)
-                ).first()
-                
-                if not existing_match:
-                    match = Match(
-                        lost_id=lost_item_id,
-                        found_id=found_item.id,
-                        score=score,
-                        auto_suggested=True
-                    )
-                    db.add(match)
-                    matches.append(match)
-        
-        db.commit()
-        return sorted(matches, key=lambda x: x.score, reverse=True)
-    
-    def _calculate_similarity_score(self, lost_item: ItemLost, found_item: ItemFound) -> float:
+        Costs two round trips however many pairs there are: one lookup of the
+        existing pairs and one batched insert.
+        """
+        if not scored_pairs:
+            return []
+        
+        existing_pairs = set((await db.execute(
+            select(Match.lost_id, Match.found_id).where(
+                Match.lost_id.in_({lost_id for lost_id, _, _ in scored_pairs}),
+                Match.found_id.in_({found_id for _, found_id, _ in scored_pairs})
+            )
+        )).all())
+        rows = [
+            {"id": str(uuid.uuid4()), "lost_id": lost_id, "found_id": found_id, "score": score, "auto_suggested": True}
+            for lost_id, found_id, score in scored_pairs
+            if (lost_id, found_id) not in existing_pairs
+        ]
+        if rows:
+            # A concurrent request may have recorded the same pair since the lookup
+            await db.execute(
+                dialect_insert(Match).on_conflict_do_nothing(index_elements=[Match.lost_id, Match.found_id]),
+                rows
+            )
+        await db.commit()
+        return [Match(**row) for row in rows]
+    
+    async def _found_photo_hashes(self, db: AsyncSession, found_ids: List[str]) -> Dict[str, List[str]]:
+        """Stored phashes of the given found items' photos, by item id"""
+        hashes = {}
+        rows = await db.execute(
+            select(ItemPhoto.item_id, ItemPhoto.phash).where(
+                ItemPhoto.item_id.in_(found_ids),
+                ItemPhoto.phash.isnot(None)
+            )
+        )
+        for item_id, phash in rows:
+            hashes.setdefault(item_id, []).append(phash)
+        return hashes
+    
+    def _photo_similarity(self, query_hashes: Sequence[str], candidate_hashes: List[Sequence[str]]) -> np.ndarray:
+        """Per candidate, 1.0 for an identical phash falling linearly to 0.0 at the match distance.
+        
+        Uses the closest pair of photos; candidates without photos score 0.
+        """
+        query = [int(phash, 16) for phash in query_hashes]
+        similarity = np.zeros(len(candidate_hashes))
+        for i, hashes in enumerate(candidate_hashes):
+            if hashes:
+                distance = min((q ^ int(phash, 16)).bit_count() for q in query for phash in hashes)
+                similarity[i] = max(0.0, 1.0 - distance / self.photo_match_distance)
+        return similarity
+    
+    def _score_candidates(self, lost_item: ItemLost, query_terms: FrozenSet[str], candidates: List[ItemFound],
+                          photo_similarity: Optional[np.ndarray] = None) -> List[Tuple[ItemFound, float]]:
+        """Found candidates scoring above the suggestion threshold, best first"""
+        if self.engine == "batch":
+            pool = self.batch_scorer.build_pool(
+                candidates,
+                [found_terms.get(item) for item in candidates],
+                [item.location_id for item in candidates],
+                [item.found_at for item in candidates]
+            )
+            scores = self.batch_scorer.score(
+                query_terms, lost_item.last_seen_location_id, lost_item.last_seen_at, pool
+            )
+        else:
+            scores = np.array([
+                self._calculate_similarity_score(lost_item, found_item, query_terms, found_terms.get(found_item))
+                for found_item in candidates
+            ])
+        
+        return self._rank(scores, lost_item.text_embedding, candidates, photo_similarity)
+    
+    def _score_lost_reports(self, found_item: ItemFound, reports: List[ItemLost],
+                            photo_similarity: Optional[np.ndarray] = None) -> List[Tuple[ItemLost, float]]:
+        """Lost reports scoring above the suggestion threshold against a found item, best first"""
+        query_terms = found_terms.get(found_item)
+        if self.engine == "batch":
+            pool = self.batch_scorer.build_pool(
+                reports,
+                [lost_terms.get(report) for report in reports],
+                [report.last_seen_location_id for report in reports],
+                [report.last_seen_at for report in reports]
+            )
+            scores = self.batch_scorer.score(
+                query_terms, found_item.location_id, found_item.found_at, pool, query_is_lost=False
+            )
+        else:
+            scores = np.array([
+                self._calculate_similarity_score(report, found_item, lost_terms.get(report), query_terms)
+                for report in reports
+            ])
+        
+        return self._rank(scores, found_item.text_embedding, reports, photo_similarity)
+    
+    def _rank(self, scores: np.ndarray, query_embedding: Optional[bytes], candidates: List,
+              photo_similarity: Optional[np.ndarray] = None) -> List[Tuple]:
+        if self.mode == "hybrid":
+            scores = self._blend_semantic(scores, query_embedding, [item.text_embedding for item in candidates])
+        if photo_similarity is not None:
+            scores = np.minimum(scores + self.photo_weight * photo_similarity, 1.0)
+        
+        return [(candidates[i], float(scores[i])) for i in self.batch_scorer.top_k(scores, MATCH_THRESHOLD)]
+    
+    def _blend_semantic(self, scores: np.ndarray, query_embedding: Optional[bytes],
+                        candidate_embeddings: List[Optional[bytes]]) -> np.ndarray:
+        """Blend heuristic scores with embedding cosine similarity"""
+        if query_embedding is None or not candidate_embeddings:
+            return scores
+        query = unpack_vector(query_embedding)
+        matrix = unpack_matrix(candidate_embeddings, len(query))
+        cosine = np.clip(matrix @ query, 0.0, 1.0)
+        return (1.0 - self.embedding_weight) * scores + self.embedding_weight * cosine
+    
+    def _calculate_similarity_score(self, lost_item: ItemLost, found_item: ItemFound,
+                                    lost_terms: FrozenSet[str], found_terms: FrozenSet[str]) -> float:
         """Calculate similarity score between lost and found items"""
         score = 0.0
         
         # Text similarity (simple keyword matching)
-        text_sim = self._text_similarity(
-            lost_item.title + " " + lost_item.description,
-            found_item.title + " " + found_item.description
-        )
+        text_sim = self._text_similarity(lost_terms, found_terms)
         score += 0.6 * text_sim
         
         # Location proximity (same building gets bonus)
@@ -70,17 +326,8 @@ class MatchingService:
         
         return min(score, 1.0)
     
-    def _text_similarity(self, text1: str, text2: str) -> float:
-        """Simple text similarity using common words"""
-        # Normalize text
-        words1 = set(re.findall(r'\w+', text1.lower()))
-        words2 = set(re.findall(r'\w+', text2.lower()))
-        
-        # Remove common stop words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        words1 = words1 - stop_words
-        words2 = words2 - stop_words
-        
+    def _text_similarity(self, words1: FrozenSet[str], words2: FrozenSet[str]) -> float:
+        """Simple text similarity using common words (pre-normalized term sets)"""
         if not words1 or not words2:
             return 0.0
         
@@ -90,6 +337,13 @@ class MatchingService:
         
         return intersection / union if union > 0 else 0.0
     
-    async def get_matches_for_lost_item(self, db: Session, lost_item_id: str) -> List[Match]:
+    async def get_matches_for_lost_item(self, db: AsyncSession, lost_item_id: str) -> List[Match]:
         """Get all matches for a lost item"""
-        return db.query(Match).filter(Match.lost_id == lost_item_id).order_by(Match.score.desc()).all()
\ No newline at end of file
+        matches = (await db.scalars(
+            select(Match)
+            .options(*found_item_loaders(Match.found_item))
+            .where(Match.lost_id == lost_item_id)
+            .order_by(Match.score.desc())
+        )).all()
+        await location_cache.attach(db, [match.found_item for match in matches])
+        return matches
\ No newline at end of file
@@ -0,0 +1,38 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Tuple
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+def encode_cursor(row_id: str) -> str:
+    """Opaque cursor pointing just past the given row"""
+    return base64.urlsafe_b64encode(json.dumps({"id": row_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[str]:
+    """Row id a cursor points past; an empty cursor means the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+async def keyset_page(db: AsyncSession, query: Select, model, sort_column, cursor: str,
+                      limit: int) -> Tuple[List, Optional[str]]:
+    """One page of query ordered by (sort_column, id), seeking past the cursor row.
+
+    The anchor's sort value is read back from its own row inside the query, so
+    the comparison never depends on how a timestamp round-trips through the
+    cursor. Every page is an index seek, however deep it is.
+    """
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        anchor = select(sort_column).where(model.id == after_id).scalar_subquery()
+        # A row-value comparison, unlike the equivalent OR, is a single index seek
+        query = query.where(tuple_(sort_column, model.id) > tuple_(anchor, after_id))
+    rows = (await db.scalars(query.order_by(sort_column, model.id).limit(limit + 1))).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1].id)
+    return rows, None
@@ -0,0 +1,104 @@
+import os
+from collections import defaultdict
+from functools import lru_cache
+from itertools import combinations
+from threading import Lock
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ItemPhoto
+
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> Tuple[int, ...]:
+    """Every CHUNK_BITS-bit mask with at most radius bits set"""
+    return tuple(
+        sum(1 << bit for bit in bits)
+        for count in range(radius + 1)
+        for bits in combinations(range(CHUNK_BITS), count)
+    )
+
+class MultiIndexHash:
+    """Multi-index hashing over 64-bit perceptual hashes under Hamming distance.
+
+    Hashes are split into four 16-bit chunks, each with its own table from
+    chunk value to hashes. If two hashes differ in at most r bits, some chunk
+    differs in at most r // 4 of them, so a query only probes the chunk
+    values that close to its own and verifies the few hashes found there.
+    """
+
+    def __init__(self):
+        self._tables = [defaultdict(set) for _ in range(CHUNKS)]
+        self._payloads = defaultdict(list)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, payload: Tuple[str, str]):
+        if value not in self._payloads:
+            for chunk, table in enumerate(self._tables):
+                table[(value >> (chunk * CHUNK_BITS)) & CHUNK_MASK].add(value)
+        self._payloads[value].append(payload)
+        self._size += 1
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, str, str]]:
+        """(distance, photo_id, item_id) for every payload within radius, nearest first"""
+        candidates = set()
+        masks = _flip_masks(radius // CHUNKS)
+        for chunk, table in enumerate(self._tables):
+            key = (value >> (chunk * CHUNK_BITS)) & CHUNK_MASK
+            for mask in masks:
+                bucket = table.get(key ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+        results = []
+        for candidate in candidates:
+            distance = (value ^ candidate).bit_count()
+            if distance <= radius:
+                results.extend((distance, photo_id, item_id) for photo_id, item_id in self._payloads[candidate])
+        results.sort()
+        return results
+
+class PhashIndex:
+    """In-memory near-duplicate index over every stored photo's phash"""
+
+    def __init__(self, radius: int = 6):
+        # Hamming distance (out of 64 bits) at or below which two photos count as near-duplicates
+        self.radius = radius
+        self._hashes = MultiIndexHash()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    async def load(self, db: AsyncSession):
+        """Build the index from all hashed photos (on startup)"""
+        hashes = MultiIndexHash()
+        rows = await db.stream(
+            select(ItemPhoto.id, ItemPhoto.item_id, ItemPhoto.phash)
+            .where(ItemPhoto.phash.isnot(None))
+            .execution_options(yield_per=1000)
+        )
+        async for photo_id, item_id, phash in rows:
+            hashes.add(int(phash, 16), (photo_id, item_id))
+        with self._lock:
+            self._hashes = hashes
+
+    def add(self, photo_id: str, item_id: str, phash: str):
+        with self._lock:
+            self._hashes.add(int(phash, 16), (photo_id, item_id))
+
+    def near(self, phash: str, radius: Optional[int] = None,
+             exclude_item_id: Optional[str] = None) -> List[Tuple[int, str, str]]:
+        """(distance, photo_id, item_id) of photos within radius, nearest first"""
+        with self._lock:
+            matches = self._hashes.search(int(phash, 16), self.radius if radius is None else radius)
+        return [match for match in matches if match[2] != exclude_item_id]
+
+# Shared by the item service (ingest, lookups) and the startup hook (load)
+phash_index = PhashIndex(int(os.getenv("PHASH_DUPLICATE_DISTANCE", "6")))
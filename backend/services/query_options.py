@@ -0,0 +1,15 @@
+from sqlalchemy.orm import joinedload, noload, selectinload
+
+from models import ItemFound
+
+# ItemFoundResponse nests the location and photos. Locations come from the
+# in-process reference cache (reference_cache.location_cache.attach), photos
+# are a collection loaded with one extra IN query rather than a JOIN that multiplies rows
+FOUND_ITEM_LOADERS = (noload(ItemFound.location), selectinload(ItemFound.photos))
+
+def found_item_loaders(relationship):
+    """Loader options for responses nesting a full found item through relationship"""
+    return (
+        joinedload(relationship).noload(ItemFound.location),
+        joinedload(relationship).selectinload(ItemFound.photos)
+    )
@@ -0,0 +1,61 @@
+import os
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import Location
+from .cache import TTLCache
+
+class LocationCache:
+    """All locations, held in process and shared by every request.
+
+    Locations are seeded once and rarely edited, so responses nest them from
+    here instead of joining the locations table.
+    """
+
+    def __init__(self, ttl: float, invalidation_path: str = None):
+        self._cache = TTLCache(maxsize=1, ttl=ttl, invalidation_path=invalidation_path)
+
+    async def _load(self, db: AsyncSession) -> Tuple[List[Location], Dict[int, Location]]:
+        cached = self._cache.get("all")
+        if cached is None:
+            locations = (await db.scalars(select(Location).order_by(Location.id))).all()
+            # Detached, so one request's session never holds instances every request shares
+            for location in locations:
+                db.expunge(location)
+            cached = (locations, {location.id: location for location in locations})
+            self._cache.set("all", cached)
+        return cached
+
+    async def all(self, db: AsyncSession) -> List[Location]:
+        return (await self._load(db))[0]
+
+    async def attach(self, db: AsyncSession, objects: Iterable, relationship: str = "location"):
+        """Fill a many-to-one location relationship (keyed by <relationship>_id) from the cache"""
+        objects = [obj for obj in objects if obj is not None]
+        by_id = (await self._load(db))[1]
+        if any(getattr(obj, relationship + "_id") not in by_id for obj in objects):
+            # A location added since the cache was filled
+            self._cache.invalidate("all")
+            by_id = (await self._load(db))[1]
+        for obj in objects:
+            set_committed_value(obj, relationship, by_id.get(getattr(obj, relationship + "_id")))
+
+    def invalidate(self):
+        self._cache.invalidate("all")
+
+    def stats(self):
+        return self._cache.stats()
+
+location_cache = LocationCache(
+    float(os.getenv("REFERENCE_CACHE_TTL", "300")),
+    os.getenv("REFERENCE_CACHE_INVALIDATION_FILE") or None
+)
+
+# Writes through the ORM, in this process or (with an invalidation file) any other, drop the cache
+@event.listens_for(Location, "after_insert")
+@event.listens_for(Location, "after_update")
+@event.listens_for(Location, "after_delete")
+def _location_changed(mapper, connection, target):
+    location_cache.invalidate()
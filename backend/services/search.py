@@ -0,0 +1,38 @@
+import re
+from typing import List
+from sqlalchemy import Select, column, func, literal_column, table
+
+from database import IS_SQLITE
+from models import ItemFound
+
+_WORD_RE = re.compile(r'\w+')
+
+# FTS5 table maintained by triggers on items_found (SQLite); see models.FOUND_SEARCH_DDL
+items_found_fts = table("items_found_fts", column("id"))
+# Stored generated tsvector column on items_found (Postgres), not mapped on the model
+search_vector = literal_column("items_found.search_vector")
+
+def search_words(text: str) -> List[str]:
+    """Words of a search box query; punctuation never reaches the full-text query syntax"""
+    return _WORD_RE.findall(text.lower())
+
+def full_text_search(query: Select, text: str) -> Select:
+    """Restrict a found-item query to items matching every word of text, best match first.
+
+    The last word also matches as a prefix, so results keep up while a word is
+    still being typed. Ranking is BM25 on SQLite and ts_rank on Postgres, with
+    title matches counting more than description matches on both.
+    """
+    words = search_words(text)
+    if not words:
+        raise ValueError("Search text must contain at least one word")
+    if IS_SQLITE:
+        match = " ".join(f'"{word}"' for word in words) + "*"
+        fts = literal_column("items_found_fts")
+        return query.join(items_found_fts, items_found_fts.c.id == ItemFound.id).where(
+            fts.op("MATCH")(match)
+        ).order_by(func.bm25(fts, 0.0, 4.0, 1.0), ItemFound.id)
+    tsquery = func.to_tsquery("english", " & ".join(words) + ":*")
+    return query.where(search_vector.op("@@")(tsquery)).order_by(
+        func.ts_rank(search_vector, tsquery).desc(), ItemFound.id
+    )
@@ -0,0 +1,104 @@
+import os
+from collections import Counter
+from typing import Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, literal, union_all, exists
+
+from database import dialect_insert
+from models import ItemFound, ItemLost, Claim, Match, StatCounter
+
+def claim_matched_condition():
+    """A claim whose item had been suggested for a lost report filed by the claimant"""
+    return exists().where(
+        Match.found_id == Claim.found_id,
+        Match.lost_id == ItemLost.id,
+        ItemLost.reporter_id == Claim.claimant_id
+    )
+
+def claimant_reported_condition():
+    """A claim whose claimant had filed at least one lost report"""
+    return exists().where(ItemLost.reporter_id == Claim.claimant_id)
+
+async def aggregate_counts(db: AsyncSession) -> Dict[str, int]:
+    """All dashboard counts in one round trip, keyed like the counter table"""
+    item_counts = select(
+        literal("items:") + func.coalesce(ItemFound.status, "available"), func.count()
+    ).group_by(ItemFound.status)
+    claim_counts = select(
+        literal("claims:") + func.coalesce(Claim.status, "requested"), func.count()
+    ).group_by(Claim.status)
+    verified = Claim.status == "verified"
+    accuracy_counts = [
+        select(literal("accuracy:reported"), func.count()).where(verified, claimant_reported_condition()),
+        select(literal("accuracy:matched"), func.count()).where(verified, claim_matched_condition()),
+    ]
+    counts = Counter()
+    for name, count in await db.execute(union_all(item_counts, claim_counts, *accuracy_counts)):
+        counts[name] += count
+    counts["items:total"] = sum(count for name, count in counts.items() if name.startswith("items:"))
+    return counts
+
+class StatsCounters:
+    """Incrementally maintained dashboard counters, making /api/stats a single-row-set read.
+
+    Increments run in the caller's transaction, so counters commit or roll
+    back with the change they describe.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("STATS_COUNTERS", "false").lower() == "true"
+
+    async def bump(self, db: AsyncSession, deltas: Dict[str, int]):
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not self.enabled or not deltas:
+            return
+        stmt = dialect_insert(StatCounter)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[StatCounter.name],
+                set_={"value": StatCounter.value + stmt.excluded.value}
+            ),
+            [{"name": name, "value": delta} for name, delta in deltas.items()]
+        )
+
+    async def item_status_changed(self, db: AsyncSession, previous_status: Optional[str], status: str):
+        if previous_status != status:
+            await self.bump(db, {f"items:{previous_status}": -1, f"items:{status}": 1})
+
+    async def item_created(self, db: AsyncSession, status: str, count: int = 1):
+        await self.bump(db, {"items:total": count, f"items:{status}": count})
+
+    async def claim_status_changed(self, db: AsyncSession, previous_status: Optional[str], status: str):
+        deltas = Counter({f"claims:{status}": 1})
+        if previous_status is not None:
+            deltas[f"claims:{previous_status}"] -= 1
+        await self.bump(db, deltas)
+
+    async def claim_verified(self, db: AsyncSession, claim: Claim, verified: bool = True):
+        """Record whether a newly verified claim was found through a suggested match.
+
+        verified=False takes back the counts of a verified claim that is being rejected.
+        """
+        if not self.enabled:
+            return
+        reported, matched = (await db.execute(
+            select(claimant_reported_condition(), claim_matched_condition()).where(Claim.id == claim.id)
+        )).one()
+        sign = 1 if verified else -1
+        await self.bump(db, {"accuracy:reported": sign * bool(reported), "accuracy:matched": sign * bool(matched)})
+
+    async def read(self, db: AsyncSession) -> Dict[str, int]:
+        return Counter(dict((await db.execute(select(StatCounter.name, StatCounter.value))).all()))
+
+    async def rebuild(self, db: AsyncSession):
+        """Reset counters from a full aggregation (on startup, when enabled)"""
+        if not self.enabled:
+            return
+        counts = await aggregate_counts(db)
+        await db.execute(update(StatCounter).values(value=0))
+        stmt = dialect_insert(StatCounter)
+        await db.execute(
+            stmt.on_conflict_do_update(index_elements=[StatCounter.name], set_={"value": stmt.excluded.value}),
+            [{"name": name, "value": value} for name, value in counts.items()]
+        )
+        await db.commit()
@@ -0,0 +1,92 @@
+import os
+import mimetypes
+from pathlib import Path
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+
+class LocalStorage:
+    """Blobs kept in a directory that the app serves itself (mounted at /uploads)"""
+
+    def __init__(self, root: Path, url_prefix: str = "/uploads"):
+        self.root = root
+        self.url_prefix = url_prefix
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        prefix = self.url_prefix + "/"
+        return url[len(prefix):] if url.startswith(prefix) else None
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = (self.root / key).resolve()
+        return path if path.is_relative_to(self.root.resolve()) else None
+
+    async def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    async def put_file(self, key: str, source: Path):
+        """Publish a finished local file under key, consuming it"""
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+
+    async def delete(self, key: str):
+        (self.root / key).unlink(missing_ok=True)
+
+class S3Storage:
+    """Blobs in an S3 bucket, or any S3-compatible endpoint such as MinIO"""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 public_url: Optional[str] = None):
+        import boto3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        if public_url is None:
+            public_url = f"{endpoint_url}/{bucket}" if endpoint_url else f"https://{bucket}.s3.amazonaws.com"
+        self.public_url = public_url.rstrip("/")
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{self.prefix}{key}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        prefix = f"{self.public_url}/{self.prefix}"
+        return url[len(prefix):] if url.startswith(prefix) else None
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    async def put_file(self, key: str, source: Path):
+        """Upload a finished local file under key, then remove the local copy"""
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        await run_in_threadpool(
+            self.client.upload_file, str(source), self.bucket, self.prefix + key,
+            # Keys are content addresses, so an object never changes once uploaded
+            ExtraArgs={"ContentType": content_type, "CacheControl": "public, max-age=31536000, immutable"}
+        )
+        source.unlink(missing_ok=True)
+
+    async def delete(self, key: str):
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=self.prefix + key)
+
+def storage_from_env(upload_dir: Path):
+    backend = os.getenv("STORAGE_BACKEND", "local")  # local, s3
+    if backend == "s3":
+        return S3Storage(
+            os.environ["S3_BUCKET"],
+            prefix=os.getenv("S3_PREFIX", ""),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+            public_url=os.getenv("S3_PUBLIC_URL") or None
+        )
+    return LocalStorage(upload_dir)
@@ -0,0 +1,35 @@
+import os
+from typing import FrozenSet
+
+from .cache import LRUCache
+from .tokenizer import tokenize, item_text
+
+def serialize_terms(terms: FrozenSet[str]) -> str:
+    """Storage form of a term set for ItemFound.search_terms"""
+    return " ".join(sorted(terms))
+
+class TermCache:
+    """Normalized term sets of found or lost items, keyed by item id"""
+
+    def __init__(self, maxsize: int = 10000):
+        self._cache = LRUCache(maxsize)
+
+    def get(self, item) -> FrozenSet[str]:
+        terms = self._cache.get(item.id)
+        if terms is None:
+            stored = getattr(item, "search_terms", None)
+            if stored is not None:
+                terms = frozenset(stored.split())
+            else:
+                # Lost reports, and found rows created before search_terms existed
+                terms = tokenize(item_text(item))
+            self._cache.set(item.id, terms)
+        return terms
+
+    def invalidate(self, item_id: str):
+        self._cache.invalidate(item_id)
+
+# Shared by the item and matching services so updates invalidate what matching reads
+found_terms = TermCache(int(os.getenv("TERM_CACHE_SIZE", "10000")))
+# Lost report text never changes, so these entries are never invalidated
+lost_terms = TermCache(int(os.getenv("TERM_CACHE_SIZE", "10000")))
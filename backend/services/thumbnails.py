@@ -0,0 +1,39 @@
+import os
+from pathlib import Path
+from typing import Dict
+from PIL import Image, features
+
+# Widths the inventory grids and detail views request
+THUMBNAIL_WIDTHS = tuple(int(width) for width in os.getenv("THUMBNAIL_WIDTHS", "320,640,1280").split(","))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMBNAIL_EXTENSION = {"WEBP": "webp", "JPEG": "jpg"}[THUMBNAIL_FORMAT]
+
+def derivative_name(content_hash: str, width: int) -> str:
+    """Cache path of one derivative, relative to the cache directory"""
+    return f"{content_hash[:2]}/{content_hash}-{width}.{THUMBNAIL_EXTENSION}"
+
+def generate_derivatives(img: Image.Image, content_hash: str, cache_dir: Path, url_prefix: str) -> Dict[str, str]:
+    """Write downscaled copies of an image at each configured width and return their URLs by width.
+
+    Files are named by the original's content hash, so identical photos share
+    one set of derivatives and an existing file is never written twice. Widths
+    above the original's are served by a copy at the original width.
+    """
+    if THUMBNAIL_FORMAT == "JPEG" or img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if THUMBNAIL_FORMAT == "WEBP" and "A" in img.getbands() else "RGB")
+    derivatives = {}
+    for requested_width in THUMBNAIL_WIDTHS:
+        width = min(requested_width, img.width)
+        name = derivative_name(content_hash, width)
+        path = cache_dir / name
+        if not path.exists():
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Per-process temp name: two workers may render the same content at once
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            resized.save(tmp_path, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+            os.replace(tmp_path, path)
+        derivatives[str(requested_width)] = f"{url_prefix}/{name}"
+    return derivatives
@@ -0,0 +1,59 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from typing import Iterable, Optional
+
+from database import dialect_insert
+from models import ItemFound, FoundItemTerm
+from .term_cache import found_terms
+
+class TokenIndex:
+    """Persistent inverted index (term -> found_id postings) over available found items.
+
+    Postings are written in the caller's transaction, so the index commits or
+    rolls back together with the item change that triggered it.
+    """
+
+    async def add_item(self, db: AsyncSession, item: ItemFound):
+        """Index an item that has just become available"""
+        await self.add_items(db, [item])
+
+    async def add_items(self, db: AsyncSession, items: Iterable[ItemFound]):
+        """Index available items with one batched statement"""
+        postings = [{"term": term, "found_id": item.id} for item in items for term in found_terms.get(item)]
+        if postings:
+            await db.execute(dialect_insert(FoundItemTerm).on_conflict_do_nothing(), postings)
+
+    async def remove_item(self, db: AsyncSession, item_id: str):
+        """Drop an item's postings once it is no longer available"""
+        await db.execute(delete(FoundItemTerm).where(FoundItemTerm.found_id == item_id))
+
+    async def sync_status(self, db: AsyncSession, item: ItemFound, previous_status: Optional[str]):
+        """Keep postings in line with an item's status transition"""
+        if previous_status == item.status:
+            return
+        if item.status == "available":
+            await self.add_item(db, item)
+        elif previous_status == "available":
+            await self.remove_item(db, item.id)
+
+    def candidate_ids(self, terms: Iterable[str]):
+        """Subquery of found item ids sharing at least one term, or None if there are no terms"""
+        terms = list(terms)
+        if not terms:
+            return None
+        return select(FoundItemTerm.found_id).where(FoundItemTerm.term.in_(terms)).distinct()
+
+    async def rebuild(self, db: AsyncSession):
+        """Rebuild the index from scratch from all available found items"""
+        await db.execute(delete(FoundItemTerm))
+        for item in (await db.scalars(select(ItemFound).where(ItemFound.status == "available"))).all():
+            await self.add_item(db, item)
+        await db.commit()
+
+    async def ensure_built(self, db: AsyncSession):
+        """Build the index on first start against a database that predates it"""
+        if await db.scalar(select(FoundItemTerm.found_id).limit(1)) is not None:
+            return
+        if await db.scalar(select(ItemFound.id).where(ItemFound.status == "available").limit(1)) is None:
+            return
+        await self.rebuild(db)
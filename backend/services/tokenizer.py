@@ -0,0 +1,15 @@
+import re
+from typing import FrozenSet
+
+# Common words that carry no signal for matching item descriptions
+STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+
+_WORD_RE = re.compile(r'\w+')
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Normalize text into the set of non-stop-word tokens used for matching"""
+    return frozenset(_WORD_RE.findall(text.lower())) - STOP_WORDS
+
+def item_text(item) -> str:
+    """Text of a found or lost item that matching is scored on"""
+    return item.title + " " + item.description
@@ -0,0 +1,68 @@
+import os
+import uuid
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import dialect_insert
+from models import User
+from .cache import TTLCache
+
+class UserResolver:
+    """Get-or-create users by email without writing for an email that already exists.
+
+    A SELECT finds known users; only a new email runs an INSERT ... ON
+    CONFLICT DO NOTHING, so a repeat submitter never takes the write lock
+    or rewrites their row. Concurrent submissions from a new email both
+    succeed (one inserts, the other finds its row), and ids of known
+    emails are cached briefly so repeat submitters skip the SELECT too.
+    """
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 4096):
+        self._ids = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def _find_or_insert(self, db: AsyncSession, email: str, name: str, role: str, column):
+        """column (User.id, or User for the whole row) of the user with this email, inserting one if needed"""
+        existing = select(column).where(User.email == email)
+        found = await db.scalar(existing)
+        if found is None:
+            insert = dialect_insert(User).values(id=str(uuid.uuid4()), email=email, name=name, role=role)
+            found = await db.scalar(insert.on_conflict_do_nothing(index_elements=[User.email]).returning(column))
+            if found is None:
+                # Another transaction inserted the email after our SELECT
+                found = await db.scalar(existing)
+        return found
+
+    async def resolve_id(self, db: AsyncSession, email: str, name: str, role: str = "student") -> str:
+        """Id of the user with this email, created with name and role if there is none"""
+        user_id = self._ids.get(email)
+        if user_id is None:
+            user_id = await self._find_or_insert(db, email, name, role, User.id)
+            self._remember_on_commit(db, email, user_id)
+        return user_id
+
+    async def get_or_create(self, db: AsyncSession, email: str, name: str, role: str = "student") -> User:
+        """Full user row with this email, created with name and role if there is none"""
+        user = await self._find_or_insert(db, email, name, role, User)
+        self._remember_on_commit(db, email, user.id)
+        return user
+
+    def _remember_on_commit(self, db: AsyncSession, email: str, user_id: str):
+        # A row inserted by a transaction that rolls back must not be cached
+        db.sync_session.info.setdefault("resolved_users", {})[email] = user_id
+
+    def _committed(self, resolved: dict):
+        for email, user_id in resolved.items():
+            self._ids.set(email, user_id)
+
+user_resolver = UserResolver(float(os.getenv("USER_CACHE_TTL", "60")))
+
+@event.listens_for(Session, "after_commit")
+def _cache_resolved_users(session):
+    resolved = session.info.pop("resolved_users", None)
+    if resolved:
+        user_resolver._committed(resolved)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_resolved_users(session):
+    session.info.pop("resolved_users", None)
@@ -2,14 +2,39 @@
 """
 Quick API test script for BearTracks.Nice
 """
+import sys
 import requests
 import json
 
 BASE_URL = "http://localhost:8000"
 
-def test_api():
+# Maximum SQL statements per read endpoint, independent of how many rows are returned.
+# The server reports the count in X-DB-Statements when started with DEBUG=true.
+# tests/test_query_budgets.py checks the same budgets against the app in-process.
+QUERY_BUDGETS = {
+    "/api/found?limit=100": 2,
+    "/api/claims?limit=100": 2,
+    "/api/search?q=backpack": 2,
+    "/api/locations": 1,
+    "/api/lost/{lost_id}/matches": 2,
+}
+
+# A lost report whose suggested matches check_query_budgets reads back
+SAMPLE_LOST_REPORT = {
+    "title": "Black umbrella",
+    "description": "Folding black umbrella with a wooden handle",
+    "category": "other",
+    "last_seen_location_id": 1,
+    "last_seen_at": "2026-10-17T10:00:00",
+    "reporter_name": "Budget Check",
+    "reporter_email": "budget.check@ucla.edu",
+}
+
+def test_api() -> int:
+    """Run every check against a running server; returns the number of failures"""
     print("🧪 Testing BearTracks.Nice API")
     print("=" * 40)
+    failures = 0
     
     try:
         # Test health endpoint
@@ -20,7 +45,7 @@ def test_api():
             print(f"   Response: {response.json()}")
         else:
             print(f"❌ Health check failed: {response.status_code}")
-            return
+            return 1
         
         # Test locations endpoint
         print("\n2. Testing locations...")
@@ -32,6 +57,7 @@ def test_api():
                 print(f"   - {loc['name']}")
         else:
             print(f"❌ Locations failed: {response.status_code}")
+            failures += 1
         
         # Test found items endpoint
         print("\n3. Testing found items...")
@@ -43,6 +69,7 @@ def test_api():
                 print(f"   - {item['title']} ({item['status']})")
         else:
             print(f"❌ Found items failed: {response.status_code}")
+            failures += 1
         
         # Test stats endpoint
         print("\n4. Testing stats...")
@@ -55,7 +82,19 @@ def test_api():
             print(f"   - On hold: {stats['on_hold_items']}")
         else:
             print(f"❌ Stats failed: {response.status_code}")
+            failures += 1
+        
+        # Test query budgets
+        print("\n5. Testing query budgets...")
+        failures += check_query_budgets()
+        
+        # Test conditional requests
+        print("\n6. Testing cache revalidation...")
+        failures += check_revalidation()
         
+        if failures:
+            print(f"\n❌ {failures} check(s) failed.")
+            return failures
         print("\n🎉 All tests passed! API is working correctly.")
         print("\nNext steps:")
         print("- Open http://localhost:3000 for the frontend")
@@ -66,8 +105,47 @@ def test_api():
         print("Make sure the backend is running:")
         print("  cd backend")
         print("  python -m uvicorn main:app --host 0.0.0.0 --port 8000 --reload")
+        return 1
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
+        return 1
+    return 0
+
+def check_query_budgets() -> int:
+    """Fail every read endpoint that issues more SQL statements than its budget"""
+    lost_report = requests.post(f"{BASE_URL}/api/lost", json=SAMPLE_LOST_REPORT)
+    lost_report.raise_for_status()
+    failures = 0
+    for endpoint, budget in QUERY_BUDGETS.items():
+        endpoint = endpoint.format(lost_id=lost_report.json()["id"])
+        response = requests.get(f"{BASE_URL}{endpoint}")
+        statements = response.headers.get("X-DB-Statements")
+        if statements is None:
+            print("❌ Statement counts unavailable (start the server with DEBUG=true)")
+            return 1
+        if response.status_code == 200 and int(statements) <= budget:
+            print(f"✅ {endpoint}: {statements} statements (budget {budget})")
+        else:
+            print(f"❌ {endpoint}: {statements} statements (budget {budget}), status {response.status_code}")
+            failures += 1
+    return failures
+
+def check_revalidation() -> int:
+    failures = 0
+    for endpoint in ("/api/locations", "/api/found?limit=100"):
+        response = requests.get(f"{BASE_URL}{endpoint}")
+        etag = response.headers.get("ETag")
+        if etag is None:
+            print(f"❌ {endpoint}: no ETag")
+            failures += 1
+            continue
+        revalidated = requests.get(f"{BASE_URL}{endpoint}", headers={"If-None-Match": etag})
+        if revalidated.status_code == 304:
+            print(f"✅ {endpoint}: 304 on revalidation ({response.headers.get('Cache-Control')})")
+        else:
+            print(f"❌ {endpoint}: expected 304, got {revalidated.status_code}")
+            failures += 1
+    return failures
 
 if __name__ == "__main__":
-    test_api()
\ No newline at end of file
+    sys.exit(1 if test_api() else 0)
\ No newline at end of file
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+# Tests import the backend modules the way main.py does, from the backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# A scratch database and upload directory, set before database.py reads the environment.
+# DEBUG makes the app report X-DB-Statements for the query budget tests.
+_scratch = tempfile.mkdtemp(prefix="beartracks-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["DEBUG"] = "true"
+os.makedirs(os.path.join(_scratch, "uploads"))
+os.chdir(_scratch)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.file_service import FileService
+
+# A lost report that the seeded "Blue Hydro Flask" found item matches
+LOST_REPORT = {
+    "title": "Blue Hydro Flask",
+    "description": "Blue water bottle with stickers",
+    "category": "bottles",
+    "last_seen_location_id": 2,
+    "last_seen_at": "2026-10-17T10:00:00",
+    "reporter_name": "Test Reporter",
+    "reporter_email": "test.reporter@ucla.edu",
+}
+
+@pytest.fixture(scope="session")
+def client():
+    """The app, running against the scratch database seeded by init_db.py"""
+    from init_db import init_database
+    init_database()
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def lost_report():
+    return dict(LOST_REPORT)
+
+@pytest.fixture(scope="session")
+def lost_id(client, lost_report):
+    """Id of lost_report, filed once through the API"""
+    response = client.post("/api/lost", json=lost_report)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+@pytest.fixture
+def file_service():
+    service = FileService()
+    yield service
+    service.shutdown()
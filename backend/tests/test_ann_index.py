@@ -0,0 +1,40 @@
+"""The in-memory ANN index only takes changes whose transaction commits"""
+import numpy as np
+import pytest
+
+import services.ann_index
+from database import AsyncSessionLocal
+from services.ann_index import IVFIndex, update_on_commit
+
+@pytest.fixture
+def index(monkeypatch):
+    index = IVFIndex()
+    monkeypatch.setattr(services.ann_index, "found_index", index)
+    return index
+
+def vector(seed: int) -> np.ndarray:
+    v = np.random.default_rng(seed).normal(size=8)
+    return v / np.linalg.norm(v)
+
+def test_updates_wait_for_commit(client, index):
+    async def transactions():
+        async with AsyncSessionLocal() as db:
+            update_on_commit(db, "kept", vector(1))
+            update_on_commit(db, "removed", vector(2))
+            assert len(index) == 0
+            await db.commit()
+        assert len(index) == 2
+
+        async with AsyncSessionLocal() as db:
+            update_on_commit(db, "removed", None)
+            update_on_commit(db, "phantom", vector(3))
+            await db.rollback()
+        assert len(index) == 2
+
+        async with AsyncSessionLocal() as db:
+            update_on_commit(db, "removed", None)
+            await db.commit()
+        assert len(index) == 1
+
+    client.portal.call(transactions)
+    assert [item_id for item_id, _ in index.search(vector(1), 5)] == ["kept"]
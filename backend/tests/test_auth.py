@@ -0,0 +1,22 @@
+"""Bearer tokens from /api/auth/login authenticate /api/auth/me until they expire"""
+from datetime import timedelta
+
+def me(client, token):
+    return client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+def test_login_token_authenticates(client):
+    response = client.post("/api/auth/login", json={"email": "auth.check@ucla.edu", "password": "x"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    # The second request is served from the verified-token cache
+    for _ in range(2):
+        response = me(client, token)
+        assert response.status_code == 200
+        assert response.json()["email"] == "auth.check@ucla.edu"
+
+def test_bad_and_expired_tokens_are_rejected(client):
+    import main
+    expired = main.auth_service.create_access_token({"sub": "auth.check@ucla.edu"}, timedelta(seconds=-1))
+    assert me(client, expired).status_code == 401
+    assert me(client, "not-a-token").status_code == 401
+    assert client.get("/api/auth/me").status_code == 401
@@ -0,0 +1,62 @@
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services.batch_scorer import BatchScorer
+from services.matching_service import MatchingService
+
+VOCABULARY = [f"term{i}" for i in range(12)]
+BASE_TIME = datetime(2026, 3, 1, 12, 0, 0)
+# Whole-day offsets on and around the 1- and 7-day bonus boundaries, in both directions
+BOUNDARY_DAYS = [0, 1, 2, 6, 7, 8, -1, -2, -7, -8]
+MICROSECOND = timedelta(microseconds=1)
+
+def random_terms(rng: random.Random) -> frozenset:
+    # Empty term sets are common enough to cover both sides of the Jaccard guard
+    return frozenset(rng.sample(VOCABULARY, rng.choice([0, 0, 1, 2, 3, 5, 8])))
+
+def random_time(rng: random.Random) -> datetime:
+    if rng.random() < 0.5:
+        offset = timedelta(days=rng.choice(BOUNDARY_DAYS)) + rng.choice([-MICROSECOND, timedelta(0), MICROSECOND])
+    else:
+        offset = timedelta(seconds=rng.randint(-10 * 86400, 10 * 86400), microseconds=rng.randint(0, 999999))
+    return BASE_TIME + offset
+
+def python_scores(service, lost_items, found_items, lost_terms, found_terms):
+    return np.array([
+        service._calculate_similarity_score(lost, found, lost_terms[i], found_terms[i])
+        for i, (lost, found) in enumerate(zip(lost_items, found_items))
+    ])
+
+@pytest.mark.parametrize("seed", range(200))
+def test_batch_engine_matches_python_engine(seed):
+    rng = random.Random(seed)
+    service = MatchingService()
+    scorer = BatchScorer()
+    size = rng.randint(1, 40)
+
+    # Lost report against found candidates
+    query_terms = random_terms(rng)
+    lost = SimpleNamespace(last_seen_location_id=rng.randint(1, 3), last_seen_at=random_time(rng))
+    found = [SimpleNamespace(location_id=rng.randint(1, 3), found_at=random_time(rng)) for _ in range(size)]
+    terms = [random_terms(rng) for _ in range(size)]
+    pool = scorer.build_pool(found, terms, [item.location_id for item in found], [item.found_at for item in found])
+    batch = scorer.score(query_terms, lost.last_seen_location_id, lost.last_seen_at, pool)
+    expected = python_scores(service, [lost] * size, found, [query_terms] * size, terms)
+    assert np.array_equal(batch, expected)
+
+    # Found item against lost reports
+    item = found[0]
+    reports = [SimpleNamespace(last_seen_location_id=rng.randint(1, 3), last_seen_at=random_time(rng)) for _ in range(size)]
+    pool = scorer.build_pool(reports, terms, [r.last_seen_location_id for r in reports], [r.last_seen_at for r in reports])
+    batch = scorer.score(query_terms, item.location_id, item.found_at, pool, query_is_lost=False)
+    expected = python_scores(service, reports, [item] * size, terms, [query_terms] * size)
+    assert np.array_equal(batch, expected)
+
+def test_empty_pool_scores_nothing():
+    scorer = BatchScorer()
+    pool = scorer.build_pool([], [], [], [])
+    assert len(scorer.score(frozenset({"term1"}), 1, BASE_TIME, pool)) == 0
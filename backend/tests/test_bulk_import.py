@@ -0,0 +1,79 @@
+"""POST /api/found/bulk reports bad rows individually and imports the rest"""
+import io
+import json
+import zipfile
+
+from PIL import Image
+
+import services.item_service
+
+REPORTER = {"reporter_name": "Intake Desk", "reporter_email": "bulk.intake@ucla.edu"}
+
+def row(**fields):
+    return {
+        "title": "Grey scarf",
+        "description": "Knitted grey wool scarf",
+        "category": "clothing",
+        "location_id": 1,
+        "found_date": "2026-10-16",
+        "found_time": "09:30",
+        **REPORTER,
+        **fields,
+    }
+
+def photos_zip() -> bytes:
+    photo = io.BytesIO()
+    Image.new("RGB", (32, 32), "grey").save(photo, format="JPEG")
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("scarf.jpg", photo.getvalue())
+    return archive.getvalue()
+
+def import_rows(client, rows):
+    manifest = "\n".join(json.dumps(r) for r in rows).encode()
+    return client.post("/api/found/bulk", files={
+        "manifest": ("manifest.ndjson", manifest, "application/x-ndjson"),
+        "photos": ("photos.zip", photos_zip(), "application/zip"),
+    })
+
+def test_bad_rows_are_reported(client, monkeypatch):
+    resolved = []
+    resolve_id = services.item_service.user_resolver.resolve_id
+
+    async def counting_resolve_id(db, email, *args):
+        resolved.append(email)
+        return await resolve_id(db, email, *args)
+
+    monkeypatch.setattr(services.item_service.user_resolver, "resolve_id", counting_resolve_id)
+    response = import_rows(client, [
+        row(photos=["scarf.jpg"]),
+        row(found_time="12"),
+        row(found_time="25:00"),
+        row(photos=42),
+        row(photos=["scarf.jpg", 7]),
+        row(location_id=999),
+        row(photos="missing.jpg"),
+        row(title="Grey gloves"),
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 6)
+    statuses = [(entry["row"], entry["status"]) for entry in body["rows"]]
+    assert statuses == [(1, "created")] + [(n, "error") for n in range(2, 8)] + [(8, "created")]
+    errors = {entry["row"]: entry["error"] for entry in body["rows"] if entry["status"] == "error"}
+    assert "HH:MM" in errors[2] and "HH:MM" in errors[3]
+    assert "photos must be" in errors[4] and "photos must be" in errors[5]
+    assert "Unknown location_id 999" in errors[6]
+    assert "missing.jpg" in errors[7]
+    # Both created rows come from one reporter, resolved once
+    assert resolved == [REPORTER["reporter_email"]]
+
+    created = [entry for entry in body["rows"] if entry["status"] == "created"]
+    assert created[0]["photos"] == 1
+    item = client.get(f"/api/found/{created[0]['id']}").json()
+    assert item["found_at"].startswith("2026-10-16T09:30")
+    assert len(item["photos"]) == 1
+
+def test_malformed_time_on_single_create(client):
+    response = client.post("/api/found", data={**row(found_time="12"), "location_id": "1"})
+    assert response.status_code == 400
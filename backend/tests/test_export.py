@@ -0,0 +1,60 @@
+"""GET /api/export streams every row of a dataset as NDJSON or CSV, one chunk per fetched batch"""
+import csv
+import io
+import json
+import math
+
+import pytest
+
+import services.export
+from services.export import DATASETS, export_rows
+
+def found_count(client, **params):
+    return len(client.get("/api/found", params={"limit": 10000, **params}).json())
+
+def test_ndjson(client):
+    response = client.get("/api/export/items_found")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["content-disposition"].endswith('.ndjson"')
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == found_count(client)
+    assert all(list(row) == DATASETS["items_found"].fields for row in rows)
+    assert all(row["location"] for row in rows)
+
+def test_csv(client):
+    response = client.get("/api/export/items_found", params={"format": "csv", "status": "available"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    reader = csv.reader(io.StringIO(response.text))
+    assert next(reader) == DATASETS["items_found"].fields
+    rows = list(reader)
+    assert len(rows) == found_count(client, status="available")
+    assert {row[DATASETS["items_found"].fields.index("status")] for row in rows} == {"available"}
+
+def test_date_range(client):
+    rows = [json.loads(line) for line in client.get("/api/export/items_found").text.splitlines()]
+    boundary = sorted(row["created_at"] for row in rows)[len(rows) // 2]
+    before = client.get("/api/export/items_found", params={"until": boundary}).text.splitlines()
+    after = client.get("/api/export/items_found", params={"since": boundary}).text.splitlines()
+    assert len(before) + len(after) == len(rows)
+    assert all(json.loads(line)["created_at"] < boundary for line in before)
+
+def test_empty_csv_has_header(client):
+    response = client.get("/api/export/claims", params={"format": "csv", "status": "no-such-status"})
+    assert response.text.splitlines() == [",".join(DATASETS["claims"].fields)]
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_one_chunk_per_batch(client, monkeypatch, fmt):
+    async def collect():
+        return [chunk async for chunk in export_rows(DATASETS["items_found"], fmt)]
+
+    whole = b"".join(client.portal.call(collect))
+    monkeypatch.setattr(services.export, "EXPORT_BATCH_SIZE", 2)
+    chunks = client.portal.call(collect)
+    assert len(chunks) == math.ceil(found_count(client) / 2)
+    assert b"".join(chunks) == whole
+
+def test_unknown_dataset_and_format(client):
+    assert client.get("/api/export/users").status_code == 404
+    assert client.get("/api/export/claims", params={"format": "xml"}).status_code == 400
@@ -0,0 +1,33 @@
+"""Photo URLs from clients must not reach files outside the upload directories"""
+import asyncio
+
+import pytest
+from PIL import Image
+
+HASH = "ab" + "0" * 62
+
+def test_content_address_is_accepted(file_service):
+    assert file_service.photo_key(f"/uploads/ab/{HASH}.jpg") == f"ab/{HASH}.jpg"
+
+@pytest.mark.parametrize("url", [
+    "/uploads/../../../etc/passwd",
+    "/uploads/../../../x/evil.png",
+    f"/uploads/ab/../../{HASH}.jpg",
+    f"/uploads/ab/{HASH}.jpg/../../secret.png",
+    f"/uploads/AB/{HASH.upper()}.jpg",
+    f"/uploads/ab/{HASH}.svg",
+    "/uploads/derived/photo.webp",
+    "https://example.com/photo.jpg",
+])
+def test_other_urls_are_rejected(file_service, url):
+    assert file_service.photo_key(url) is None
+
+def test_phash_ignores_files_outside_uploads(file_service, tmp_path):
+    outside = tmp_path / "evil.png"
+    Image.new("RGB", (8, 8)).save(outside)
+    url = "/uploads/" + "../" * 20 + str(outside).lstrip("/")
+    assert asyncio.run(file_service.photo_phash(url)) is None
+
+def test_local_path_stays_under_root(file_service):
+    assert file_service.storage.local_path("../outside.png") is None
+    assert file_service.storage.local_path(f"ab/{HASH}.jpg") is not None
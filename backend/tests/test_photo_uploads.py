@@ -0,0 +1,70 @@
+"""Uploads are only staged when they decode as the image their signature claims, and stay
+staged while any request still needs them"""
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from database import AsyncSessionLocal
+from services.file_service import UnsupportedPhoto
+
+def jpeg_bytes(color: str = "red") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+def upload(data: bytes, filename: str = "photo.jpg") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+def staged_files(file_service):
+    return [path for path in file_service.staging_dir.rglob("*") if path.is_file()]
+
+def test_valid_photo_is_staged(file_service):
+    url = asyncio.run(file_service.save_photo(upload(jpeg_bytes())))
+    key = file_service.photo_key(url)
+    assert key is not None
+    assert (file_service.staging_dir / key).is_file()
+
+@pytest.mark.parametrize("data", [
+    b"\xff\xd8\xff" + b"\x00" * 1024,
+    jpeg_bytes()[:200],
+    b"\x89PNG\r\n\x1a\n" + b"garbage" * 100,
+])
+def test_corrupt_photo_is_rejected(file_service, data):
+    before = staged_files(file_service)
+    with pytest.raises(UnsupportedPhoto):
+        asyncio.run(file_service.save_photo(upload(data)))
+    assert staged_files(file_service) == before
+
+def test_discard_keeps_a_file_another_request_uses(client, file_service):
+    async def race():
+        async with AsyncSessionLocal() as db:
+            # Two requests upload the same bytes; the second finds the first one's staged file
+            first = await file_service.save_photo(upload(jpeg_bytes("blue")))
+            second = await file_service.save_photo(upload(jpeg_bytes("blue")))
+            assert first == second
+            staged_path = file_service.staging_dir / file_service.photo_key(first)
+            # The first request fails before writing its row
+            await file_service.discard_upload(db, first)
+            assert staged_path.is_file()
+            # The second commits its reference; a later failed upload must not remove the file either
+            await file_service.retain(db, [second])
+            await db.commit()
+            third = await file_service.save_photo(upload(jpeg_bytes("blue")))
+            await file_service.discard_upload(db, third)
+            assert staged_path.is_file()
+
+    client.portal.call(race)
+
+def test_discard_removes_an_unshared_upload(client, file_service):
+    async def discard():
+        async with AsyncSessionLocal() as db:
+            url = await file_service.save_photo(upload(jpeg_bytes("green")))
+            staged_path = file_service.staging_dir / file_service.photo_key(url)
+            assert staged_path.is_file()
+            await file_service.discard_upload(db, url)
+            assert not staged_path.exists()
+
+    client.portal.call(discard)
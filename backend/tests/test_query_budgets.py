@@ -0,0 +1,18 @@
+import pytest
+
+from test_api import QUERY_BUDGETS
+
+@pytest.fixture(scope="module")
+def claimed(client):
+    # Every budgeted listing returns rows, so a per-row query would show in the count
+    found_id = next(item["id"] for item in client.get("/api/found").json() if item["title"] == "iPhone 14 Pro")
+    client.post("/api/claims", json={
+        "found_id": found_id, "claimant_name": "Budget Check", "claimant_email": "budget.check@ucla.edu"
+    }).raise_for_status()
+
+@pytest.mark.parametrize("endpoint,budget", QUERY_BUDGETS.items())
+def test_query_budget(client, claimed, lost_id, endpoint, budget):
+    response = client.get(endpoint.format(lost_id=lost_id))
+    assert response.status_code == 200
+    assert response.json()
+    assert int(response.headers["X-DB-Statements"]) <= budget
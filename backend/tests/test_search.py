@@ -0,0 +1,58 @@
+"""GET /api/search: every word must match, the last one as a prefix, title hits first"""
+import json
+
+import pytest
+
+@pytest.fixture(scope="module")
+def ranked_ids(client):
+    """A title match and a description-only match for the same word"""
+    rows = [
+        {"title": "Grey wallet", "description": "Leather, with a zanzibar sticker"},
+        {"title": "Zanzibar keychain", "description": "Small brass keychain"},
+    ]
+    manifest = "\n".join(json.dumps({
+        **row,
+        "category": "accessories",
+        "location_id": 1,
+        "found_date": "2026-10-16",
+        "reporter_name": "Search Check",
+        "reporter_email": "search.check@ucla.edu",
+    }) for row in rows).encode()
+    response = client.post("/api/found/bulk", files={"manifest": ("items.ndjson", manifest, "application/x-ndjson")})
+    description_match, title_match = (row["id"] for row in response.json()["rows"])
+    return title_match, description_match
+
+def titles(client, q, **params):
+    response = client.get("/api/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return [item["title"] for item in response.json()]
+
+def test_whole_words(client):
+    assert "Black Jansport Backpack" in titles(client, "backpack")
+    assert "Black Jansport Backpack" in titles(client, "Jansport BACKPACK")
+
+def test_last_word_is_a_prefix(client):
+    assert titles(client, "hydro fl")[0] == "Blue Hydro Flask"
+    assert "Black Jansport Backpack" in titles(client, "backp")
+    # Only the last word is a prefix
+    assert titles(client, "hyd flask") == []
+
+def test_every_word_must_match(client):
+    assert titles(client, "backpack macbook") == []
+
+def test_filters_apply(client):
+    assert titles(client, "backpack", category="no-such-category") == []
+
+def test_title_matches_rank_first(client, ranked_ids):
+    response = client.get("/api/search", params={"q": "zanzibar"})
+    assert [item["id"] for item in response.json()] == list(ranked_ids)
+
+@pytest.mark.parametrize("q", ['backpack" OR "x', "backpack AND", "NEAR(backpack)", "back-pack*", "(backpack"])
+def test_query_syntax_is_not_interpreted(client, q):
+    assert client.get("/api/search", params={"q": q}).status_code == 200
+
+@pytest.mark.parametrize("q", ["", "   ", "!!!", "*"])
+def test_query_without_words_is_rejected(client, q):
+    response = client.get("/api/search", params={"q": q})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Search text must contain at least one word"
@@ -0,0 +1,52 @@
+"""Maintained dashboard counters agree with a full aggregation after claim transitions"""
+import pytest
+
+@pytest.fixture(scope="module")
+def stats(client):
+    """The app's counters, switched on and rebuilt from the rows written so far"""
+    import main
+    stats = main.item_service.stats
+    stats.enabled = True
+
+    async def rebuild():
+        async with main.AsyncSessionLocal() as db:
+            await stats.rebuild(db)
+
+    client.portal.call(rebuild)
+    yield stats
+    stats.enabled = False
+
+def assert_counters_match_aggregation(client, stats):
+    counted = client.get("/api/stats").json()
+    stats.enabled = False
+    try:
+        aggregated = client.get("/api/stats").json()
+    finally:
+        stats.enabled = True
+    assert counted == aggregated
+    return counted
+
+@pytest.fixture(scope="module")
+def matched_claim(client, lost_report, lost_id):
+    """A claim on an item suggested for the claimant's own lost report"""
+    matches = client.get(f"/api/lost/{lost_id}/matches").json()
+    assert matches
+    claim = client.post("/api/claims", json={
+        "found_id": matches[0]["found_item"]["id"],
+        "claimant_name": lost_report["reporter_name"],
+        "claimant_email": lost_report["reporter_email"],
+    }).json()
+    return claim["id"]
+
+def verify(client, claim_id, verified):
+    response = client.put(f"/api/claims/{claim_id}/verify", json={"verified": verified, "verifier_id": "staff"})
+    assert response.status_code == 200
+
+def test_verify_then_reject(client, stats, matched_claim):
+    before = assert_counters_match_aggregation(client, stats)
+    verify(client, matched_claim, True)
+    verified = assert_counters_match_aggregation(client, stats)
+    assert verified["match_accuracy"] > 0
+    verify(client, matched_claim, False)
+    rejected = assert_counters_match_aggregation(client, stats)
+    assert rejected["match_accuracy"] == before["match_accuracy"]
@@ -0,0 +1,39 @@
+"""Resolving a known email reads the user row without writing it"""
+from sqlalchemy import event
+
+from database import AsyncSessionLocal, async_engine
+from services.user_resolver import UserResolver
+
+EMAIL = "resolver.check@ucla.edu"
+
+def run(client, work):
+    """Run an async function against the database on the app's event loop, recording its SQL"""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.lstrip().split()[0].upper())
+
+    async def in_session():
+        async with AsyncSessionLocal() as db:
+            result = await work(db)
+            await db.commit()
+            return result
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        return client.portal.call(in_session), statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+def test_new_then_known_email(client):
+    # Fresh resolvers, so the id cache does not hide the statements
+    created, statements = run(client, lambda db: UserResolver().resolve_id(db, EMAIL, "Resolver Check"))
+    assert "INSERT" in statements
+
+    known, statements = run(client, lambda db: UserResolver().resolve_id(db, EMAIL, "Someone Else"))
+    assert known == created
+    assert statements == ["SELECT"]
+
+    user, statements = run(client, lambda db: UserResolver().get_or_create(db, EMAIL, "Someone Else"))
+    assert user.id == created and user.name == "Resolver Check"
+    assert statements == ["SELECT"]
@@ -27,6 +27,24 @@ export class ApiClient {
     return response.json()
   }
 
+  private async requestPage<T>(endpoint: string, params: Record<string, string | number | undefined>) {
+    const searchParams = new URLSearchParams()
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) {
+        searchParams.append(key, value.toString())
+      }
+    })
+
+    const response = await fetch(`${this.baseUrl}${endpoint}?${searchParams}`)
+
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.status} ${response.statusText}`)
+    }
+
+    const items: T[] = await response.json()
+    return { items, nextCursor: response.headers.get('X-Next-Cursor') }
+  }
+
   // Found Items
   async createFoundItem(formData: FormData) {
     const response = await fetch(`${this.baseUrl}/api/found`, {
@@ -41,6 +59,22 @@ export class ApiClient {
     return response.json()
   }
 
+  async importFoundItems(manifest: File, photos?: File) {
+    const formData = new FormData()
+    formData.append('manifest', manifest)
+    if (photos) formData.append('photos', photos)
+    const response = await fetch(`${this.baseUrl}/api/found/bulk`, {
+      method: 'POST',
+      body: formData,
+    })
+    
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.status}`)
+    }
+    
+    return response.json()
+  }
+
   async getFoundItems(params?: {
     status?: string
     category?: string
@@ -60,10 +94,45 @@ export class ApiClient {
     return this.request(`/api/found?${searchParams}`)
   }
 
+  // Full-text search over title and description, most relevant first
+  async searchFoundItems(q: string, params?: {
+    status?: string
+    category?: string
+    location_id?: number
+    skip?: number
+    limit?: number
+  }) {
+    const searchParams = new URLSearchParams({ q })
+    if (params) {
+      Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined) {
+          searchParams.append(key, value.toString())
+        }
+      })
+    }
+    
+    return this.request(`/api/search?${searchParams}`)
+  }
+
+  // Keyset pagination: pass cursor '' for the first page, then the returned nextCursor
+  async getFoundItemsPage(params: {
+    status?: string
+    category?: string
+    location_id?: number
+    cursor?: string
+    limit?: number
+  } = {}) {
+    return this.requestPage('/api/found', { cursor: '', ...params })
+  }
+
   async getFoundItem(itemId: string) {
     return this.request(`/api/found/${itemId}`)
   }
 
+  async getPossibleDuplicates(itemId: string) {
+    return this.request(`/api/found/${itemId}/duplicates`)
+  }
+
   async updateItemStatus(itemId: string, status: string) {
     return this.request(`/api/found/${itemId}/status`, {
       method: 'PUT',
@@ -104,6 +173,10 @@ export class ApiClient {
     return this.request(`/api/claims?${searchParams}`)
   }
 
+  async getClaimsPage(params: { status?: string; cursor?: string; limit?: number } = {}) {
+    return this.requestPage('/api/claims', { cursor: '', ...params })
+  }
+
   async verifyClaim(claimId: string, data: any) {
     return this.request(`/api/claims/${claimId}/verify`, {
       method: 'PUT',
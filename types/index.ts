@@ -35,6 +35,8 @@ export interface ItemPhoto {
   itemId: string
   url: string
   phash?: number
+  thumbnails?: Record<string, string>  // width -> URL, filled once the photo has been processed
+  duplicateOf?: string  // near-identical photo already logged for another item
   imgEmbedding?: number[]
   createdAt: string
 }